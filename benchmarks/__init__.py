@@ -0,0 +1,5 @@
+'''
+Benchmarks of the graph on synthetic DBLP shaped datasets.
+Run python3 -m benchmarks.run from the root folder, the results are saved
+as JSON and two results files can be compared with benchmarks.compare
+'''
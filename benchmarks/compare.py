@@ -0,0 +1,72 @@
+'''
+Module to compare two benchmark results files, phase by phase
+'''
+import sys
+import json
+
+def compare(old: dict, new: dict):
+    '''
+    Compares the times and peak memory of the phases measured on both results
+    Args:
+        old: The results of benchmarks.run used as reference
+        new: The results of benchmarks.run to compare
+    Returns:
+        A list of dicts with the size, the phase, the seconds and peak memory
+        on each results and the ratios new / old
+    '''
+    old_sizes = {result['size']: result for result in old['sizes']}
+    rows = []
+    for result in new['sizes']:
+        reference = old_sizes.get(result['size'])
+        if reference is None:
+            continue
+        for phase, measure in result['phases'].items():
+            if phase not in reference['phases']:
+                continue
+            before = reference['phases'][phase]
+            rows.append({
+                "size": result['size'],
+                "phase": phase,
+                "old_seconds": before['seconds'],
+                "new_seconds": measure['seconds'],
+                "time_ratio": _ratio(measure['seconds'], before['seconds']),
+                "old_peak_bytes": before['peak_bytes'],
+                "new_peak_bytes": measure['peak_bytes'],
+                "memory_ratio": _ratio(measure['peak_bytes'], before['peak_bytes'])
+            })
+    return rows
+
+def _ratio(new, old):
+    '''
+    Gets new / old, or None if it is not defined
+    '''
+    if new is None or not old:
+        return None
+    return new / old
+
+def main(argv):
+    '''
+    Main entry point to print the comparison of two results files
+    '''
+    if len(argv) != 2:
+        print('python3 -m benchmarks.compare <old_results> <new_results>')
+        sys.exit(2)
+    with open(argv[0]) as old_file, open(argv[1]) as new_file:
+        old = json.load(old_file)
+        new = json.load(new_file)
+    print("{} -> {}\n".format(old.get('version'), new.get('version')))
+    print("{:>10} {:<24} {:>10} {:>10} {:>8} {:>8}".format(
+        "size", "phase", "old (s)", "new (s)", "time", "memory"))
+    for row in compare(old, new):
+        print("{:>10} {:<24} {:>10.4f} {:>10.4f} {:>8} {:>8}".format(
+            row['size'], row['phase'], row['old_seconds'], row['new_seconds'],
+            _format(row['time_ratio']), _format(row['memory_ratio'])))
+
+def _format(ratio):
+    '''
+    Formats a ratio as a multiplier
+    '''
+    return '-' if ratio is None else '{:.2f}x'.format(ratio)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,99 @@
+'''
+Module to generate synthetic publications with the same schema as the
+DBLP dumps. Each conference has its own community of authors, so authors
+mostly publish with the same people, and a few authors publish at other
+conferences and connect the communities. The number of authors of a
+publication and the number of publications of an author follow heavy
+tailed distributions, as on DBLP
+'''
+import os
+import gzip
+import json
+import numpy as np
+from src.conf import ARIS
+
+COMMUNITY_SIZE = 100
+MAX_AUTHORS = 20
+
+def generate_dataset(path: str, authors: int, publications: int = None, seed: int = 0,
+                     community_size: int = COMMUNITY_SIZE, outside: float = 0.05,
+                     skew: float = 1.2, max_authors: int = MAX_AUTHORS):
+    '''
+    Writes a synthetic dataset as a JSON list of publications
+    Args:
+        path: The path of the file, it is gzip compressed if it ends with .gz
+        authors: The number of authors
+        publications: The number of publications, twice the number of
+            authors if it is not set
+        seed: The seed of the random generator
+        community_size: The mean number of authors of each conference
+        outside: The probability that an author of a publication is picked
+            from all the authors instead of the conference community
+        skew: The exponent of the Zipf distribution of the number of
+            publications of the authors (larger is less skewed)
+        max_authors: The maximum number of authors of a publication
+    Returns:
+        A dict with the numbers of authors, publications and conferences
+    '''
+    rng = np.random.RandomState(seed)
+    publications = publications or 2 * authors
+    conferences = max(1, authors // community_size)
+    # Each author gets a popularity, the chance of being picked for a
+    # publication is proportional to it
+    popularity = 1.0 / np.arange(1, authors + 1) ** (1 / skew)
+    popularity = popularity[rng.permutation(authors)]
+    community = rng.randint(conferences, size=authors)
+    # Cumulative popularity of each community shifted by its number, so a
+    # single searchsorted picks an author of any community
+    by_community = np.argsort(community, kind='stable')
+    totals = np.bincount(community, weights=popularity, minlength=conferences)
+    shares = popularity[by_community] / totals[community[by_community]]
+    starts = np.concatenate(([0], np.cumsum(np.bincount(community, minlength=conferences))))
+    cumulative = np.cumsum(shares)
+    cumulative -= np.repeat(np.concatenate(([0], cumulative))[starts[:-1]], np.diff(starts))
+    cumulative += community[by_community]
+    everyone = np.cumsum(popularity) / popularity.sum()
+    # Heavy tailed authors per publication, with a mean close to three
+    sizes = np.minimum(rng.zipf(2.5, size=publications) + rng.poisson(1.2, size=publications),
+                       max_authors)
+    venues = rng.randint(conferences, size=publications)
+    venues[0] = community[0]
+    draws = rng.random_sample(sizes.sum())
+    inside = np.searchsorted(cumulative, np.repeat(venues, sizes) + draws, side='right')
+    inside = by_community[np.minimum(inside, authors - 1)]
+    outside_picks = np.minimum(np.searchsorted(everyone, draws, side='right'), authors - 1)
+    picks = np.where(rng.random_sample(sizes.sum()) < outside, outside_picks, inside)
+    # Aris is on the first publication, so he is always on the graph
+    picks[0] = 0
+    ends = np.cumsum(sizes)
+    folder = os.path.dirname(path)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    opener = gzip.open if path.endswith('.gz') else open
+    with opener(path, 'wt') as output:
+        output.write('[')
+        for pub in range(publications):
+            venue = venues[pub]
+            picked = set(picks[ends[pub] - sizes[pub]:ends[pub]].tolist())
+            entry = {
+                "id_conference": "conf/synthetic/{}".format(venue),
+                "id_conference_int": int(venue),
+                "id_publication": "conf/synthetic/{}/{}".format(venue, pub),
+                "id_publication_int": pub,
+                "title": "Synthetic publication {}".format(pub),
+                "authors": [{"author": _author_name(author), "author_id": author}
+                            for author in sorted(picked)]
+            }
+            if pub:
+                output.write(',\n')
+            json.dump(entry, output)
+        output.write(']\n')
+    return {"authors": authors, "publications": publications, "conferences": conferences}
+
+def _author_name(author: int):
+    '''
+    Gets the name of a synthetic author, author 0 is Aris
+    '''
+    if author == 0:
+        return ARIS.lower()
+    return "author {}".format(author)
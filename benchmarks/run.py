@@ -0,0 +1,301 @@
+'''
+Module to benchmark the graph on synthetic datasets of several sizes.
+For each size a dataset is generated on its own folder and every phase
+(graph build, weighting, save and load, shortest paths, hop subgraphs,
+group numbers and centralities) is timed, taking the best of a number of
+repeats, and then run once more with tracemalloc to get its peak memory.
+The peak memory only counts the allocations of the current process, so
+it does not include the worker processes of the centralities.
+The results are saved as JSON, to be compared between versions with
+benchmarks.compare
+'''
+import os
+import sys
+import json
+import time
+import shutil
+import getopt
+import platform
+import tempfile
+import resource
+import subprocess
+import tracemalloc
+from contextlib import redirect_stdout, redirect_stderr
+from datetime import datetime, timezone
+import numpy as np
+import networkx as nx
+from src.conf import FULL_DATA, GRAPH, WORKERS
+from src.graph import Graph
+from src.store import GraphStore, fingerprint
+from src.weights import jaccard_weights
+from benchmarks.generate import generate_dataset
+
+SIZES = [1000, 10000]
+REPEAT = 3
+HOP_DIST = 2
+GROUP_SIZE = 10
+
+def run_benchmarks(sizes: list = None, repeat: int = REPEAT, seed: int = 0,
+                   workdir: str = None, workers: int = WORKERS, memory: bool = True):
+    '''
+    Runs every phase for each size
+    Args:
+        sizes: A list with the number of authors of each dataset
+        repeat: The number of timed runs of each phase
+        seed: The seed of the datasets and of the queried authors
+        workdir: The folder where the datasets are created, a temporary
+            folder that is removed at the end if it is not set
+        workers: The number of processes of the centralities
+        memory: If memory equals false the peak memory is not measured
+    Returns:
+        A dict with the environment and the results of each size
+    '''
+    sizes = sizes or SIZES
+    temporary = workdir is None
+    workdir = tempfile.mkdtemp(prefix='benchmarks') if temporary else os.path.abspath(workdir)
+    results = {
+        "version": _version(),
+        "created": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "numpy": np.__version__,
+        "networkx": nx.__version__,
+        "repeat": repeat,
+        "seed": seed,
+        "workers": workers,
+        "sizes": []
+    }
+    cwd = os.getcwd()
+    try:
+        for size in sizes:
+            folder = os.path.join(workdir, "authors_{}".format(size))
+            os.makedirs(folder, exist_ok=True)
+            os.chdir(folder)
+            print("Benchmarking {} authors".format(size))
+            results["sizes"].append(_run_size(size, repeat, seed, workers, memory))
+    finally:
+        os.chdir(cwd)
+        if temporary:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return results
+
+def _run_size(size: int, repeat: int, seed: int, workers: int, memory: bool):
+    '''
+    Generates the dataset of a size on the current folder and runs every phase
+    Returns:
+        A dict with the dataset and the measures of each phase
+    '''
+    start = time.perf_counter()
+    dataset = generate_dataset(FULL_DATA, size, seed=seed)
+    dataset["generate_seconds"] = time.perf_counter() - start
+    dataset["bytes"] = os.path.getsize(FULL_DATA)
+    state = {'workers': workers}
+    phases = {}
+    for name, prepare in PHASES:
+        phases[name] = _measure(prepare, state, repeat, memory)
+        print("    {:<24} {:>10.4f}s".format(name, phases[name]["seconds"]))
+        if name == 'build':
+            _choose_queries(state, seed)
+    graph = state['compact'].store.csr
+    dataset["nodes"] = len(graph)
+    dataset["edges"] = int(graph.indptr[-1]) // 2
+    return {
+        "size": size,
+        "dataset": dataset,
+        "phases": phases,
+        "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    }
+
+def _measure(prepare, state: dict, repeat: int, memory: bool):
+    '''
+    Times a phase and measures its peak memory
+    Args:
+        prepare: A function that gets the state and returns the function to
+            measure, so the preparation of each run is not measured
+        state: A dict shared by the phases of a size
+    Returns:
+        A dict with the best time, all the times and the peak memory in bytes
+    '''
+    times = []
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull), redirect_stderr(devnull):
+        for _ in range(repeat):
+            function = prepare(state)
+            start = time.perf_counter()
+            function()
+            times.append(time.perf_counter() - start)
+        peak = None
+        if memory:
+            function = prepare(state)
+            tracemalloc.start()
+            function()
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return {"seconds": min(times), "times": times, "peak_bytes": peak}
+
+def _choose_queries(state: dict, seed: int):
+    '''
+    Loads the graphs used by the query phases and picks the queried authors
+    and conference
+    '''
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull), redirect_stderr(devnull):
+        state['networkx'] = Graph()
+        _ = state['networkx'].graph
+        state['compact'] = Graph(compact=True)
+        state['compact'].csr.matrix()
+        _ = state['compact'].graph
+    store = state['compact'].store
+    rng = np.random.RandomState(seed)
+    ids = store.csr.ids
+    state['author'] = int(ids[rng.randint(len(ids))])
+    state['seeds'] = [int(node) for node in rng.choice(ids, min(GROUP_SIZE, len(ids)),
+                                                         replace=False)]
+    authors = np.diff(store.arrays['conf_authors_indptr'])
+    state['conference'] = int(store.arrays['conference_ids'][np.argmax(authors)])
+
+def _build(state: dict):
+    '''
+    Creates the graph from the dataset, with the weights, and saves it
+    '''
+    shutil.rmtree(GRAPH, ignore_errors=True)
+    def run():
+        state['graph'] = Graph()
+    return run
+
+def _weighting(state: dict):
+    '''
+    Calculates the weights of all the edges
+    '''
+    graph = state['graph'].graph
+    edges = list(graph.edges())
+    return lambda: jaccard_weights(graph, edges)
+
+def _save(state: dict):
+    '''
+    Saves the graph as a store
+    '''
+    graph = state['graph'].graph
+    path = GRAPH + '_benchmark'
+    return lambda: GraphStore.from_networkx(graph, fingerprint(FULL_DATA)).save(path)
+
+def _load(_: dict):
+    '''
+    Loads the saved graph
+    '''
+    return Graph
+
+def _materialize(_: dict):
+    '''
+    Creates the NetworkX graph of a loaded graph
+    '''
+    graph = Graph()
+    return lambda: graph.graph
+
+def _shortest_path(compact: bool):
+    '''
+    Dijkstra algorithm from an author to every node
+    '''
+    def prepare(state: dict):
+        graph = state['compact' if compact else 'networkx']
+        return lambda: graph.shortest_path(state['author'])
+    return prepare
+
+def _subgraph_author(compact: bool):
+    '''
+    Hop subgraph of an author
+    '''
+    def prepare(state: dict):
+        graph = state['compact' if compact else 'networkx']
+        return lambda: graph.get_subgraph_author(state['author'], HOP_DIST)
+    return prepare
+
+def _hop_histograms(state: dict):
+    '''
+    Hop histograms of the group of authors
+    '''
+    graph = state['compact']
+    return lambda: graph.hop_histograms(state['seeds'], HOP_DIST + 2)
+
+def _group_number(compact: bool):
+    '''
+    Group numbers of a list of authors
+    '''
+    def prepare(state: dict):
+        graph = state['compact' if compact else 'networkx']
+        return lambda: graph.set_group_number(state['seeds'])
+    return prepare
+
+def _centralities(state: dict):
+    '''
+    Centralities of the subgraph of the conference with most authors
+    '''
+    graph = state['networkx']
+    subgraph = graph.get_subgraph_conf(state['conference'])
+    return lambda: graph.get_centralities(subgraph, workers=state['workers'])
+
+PHASES = [
+    ('build', _build),
+    ('weighting', _weighting),
+    ('save', _save),
+    ('load', _load),
+    ('materialize', _materialize),
+    ('shortest_path', _shortest_path(False)),
+    ('shortest_path_compact', _shortest_path(True)),
+    ('subgraph_author', _subgraph_author(False)),
+    ('subgraph_author_compact', _subgraph_author(True)),
+    ('hop_histograms', _hop_histograms),
+    ('group_number', _group_number(False)),
+    ('group_number_compact', _group_number(True)),
+    ('centralities', _centralities)
+]
+
+def _version():
+    '''
+    Gets the current git commit, or None outside of a git repository
+    '''
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL,
+                                       universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def main(argv):
+    '''
+    Main entry point to run the benchmarks
+    '''
+    usage = 'python3 -m benchmarks.run -s <sizes> -o <output> -n <repeat> -w <workdir> \
+--seed <seed> --workers <workers> --no-memory'
+    sizes = SIZES
+    output = 'benchmark_results.json'
+    options = {}
+    try:
+        opts, _ = getopt.getopt(argv, "hs:o:n:w:",
+                                ["sizes=", "output=", "repeat=", "workdir=", "seed=",
+                                 "workers=", "no-memory"])
+        for opt, arg in opts:
+            if opt == '-h':
+                print(usage)
+                sys.exit(0)
+            elif opt in ('-s', '--sizes'):
+                sizes = [int(size) for size in arg.split(',')]
+            elif opt in ('-o', '--output'):
+                output = arg
+            elif opt in ('-n', '--repeat'):
+                options['repeat'] = int(arg)
+            elif opt in ('-w', '--workdir'):
+                options['workdir'] = arg
+            elif opt == '--seed':
+                options['seed'] = int(arg)
+            elif opt == '--workers':
+                options['workers'] = int(arg)
+            elif opt == '--no-memory':
+                options['memory'] = False
+    except (getopt.GetoptError, ValueError):
+        print(usage)
+        sys.exit(2)
+    results = run_benchmarks(sizes, **options)
+    with open(output, 'w') as jfile:
+        json.dump(results, jfile, indent=2)
+    print("{} available under current directory\n".format(output))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -1,13 +1,50 @@
 '''
 Module with functions to answer the questions on Homework 4
 '''
+import os
 import sys
 import getopt
 import json
+from src.conf import GRAPH, RED_GRAPH
 from src.graph import Graph
+from src.layout import LayoutCache
+from src.results import open_writer
+from src.render import FIGURE_SIZE, FORMATS, subgraph_author_layout, draw_subgraph_author, \
+    draw_aris_path, render
+from src.server import serve, query, is_running
+from src.batch import BatchRunner
+from src.instrument import set_quiet, recording, say
 import networkx as nx
 import matplotlib.pyplot as plt
-import matplotlib.patches as mpatches
+
+def forward(request: dict, reduced: bool = False):
+    '''
+    Sends a request to the query server, if there is one running with
+    the same data
+    Args:
+        request: A dict with the name of the query on 'query' and its arguments
+        reduced: If the reduced data is being used or not
+    Returns:
+        The answer of the server as a dict, or None if there is no server
+    '''
+    if not is_running(reduced):
+        return None
+    try:
+        return query(request)
+    except ConnectionError:
+        return None
+    except ValueError as error:
+        print(str(error))
+        sys.exit(2)
+
+def layout_cache(reduced: bool = False):
+    '''
+    Gets the LayoutCache of the saved graph, so the plots of the same authors
+    reuse their layouts, even when the graph is on a query server
+    Args:
+        reduced: If the reduced data is being used or not
+    '''
+    return LayoutCache(os.path.join(RED_GRAPH if reduced else GRAPH, 'layouts'))
 
 def viz_subgraph_author(author_id: int, max_hop_dist: int, reduced: bool = False):
     '''
@@ -19,26 +56,22 @@ def viz_subgraph_author(author_id: int, max_hop_dist: int, reduced: bool = False
         reduced: If reduced equals true it will use the reduced data
             to create the graph, otherwise it will use the full data
     '''
-    graph = Graph(reduced)
-    subgraph, node_list = graph.get_subgraph_author(author_id, max_hop_dist)
-    author_component = nx.node_connected_component(graph.graph, author_id)
-    per = round((len(subgraph.nodes())/len(author_component))*100, 2)
+    answer = forward({"query": "subgraph", "author_id": author_id,
+                      "max_hop_dist": max_hop_dist}, reduced)
+    if answer is not None:
+        node_list = answer['node_list']
+        subgraph = nx.Graph()
+        subgraph.add_nodes_from(node for nodes in node_list for node in nodes)
+        subgraph.add_edges_from(answer['edges'])
+        per = answer['component_percentage']
+    else:
+        graph = Graph(reduced)
+        subgraph, node_list = graph.get_subgraph_author(author_id, max_hop_dist)
+        per = round((len(subgraph.nodes())/graph.component_size(author_id))*100, 2)
     print("Percentage of component = {}".format(str(per)))
-    pos = nx.fruchterman_reingold_layout(subgraph)
-    legend_handles = []
-    plt.figure(figsize=(16, 12))
-    cmap = plt.cm.get_cmap('hsv', len(node_list)+1)
-    for index, value in enumerate(node_list):
-        color = cmap(index)
-        if index == 0:
-            label = "Root"
-        else:
-            label = 'Distance {}'.format(str(index))
-        patch = mpatches.Patch(color=color, label=label)
-        legend_handles.append(patch)
-        nx.draw_networkx(subgraph, pos=pos, nodelist=value, node_color=color,
-                         with_labels=False, node_size=100)
-    plt.legend(handles=legend_handles)
+    pos = subgraph_author_layout(subgraph, node_list, layout_cache(reduced))
+    figure = plt.figure(figsize=FIGURE_SIZE)
+    draw_subgraph_author(figure.gca(), subgraph, node_list, pos)
     plt.show()
 
 def aris_distance(author_id: int, reduced: bool = False):
@@ -49,85 +82,210 @@ def aris_distance(author_id: int, reduced: bool = False):
         reduced: If reduced equals true it will use the reduced data
             to create the graph, otherwise it will use the full data
     '''
-    graph = Graph(reduced)
-    author_name = graph.get_author_name(author_id)
-    print("Getting shortest path weight between {} and Aris\n".format(author_name))
-    path = graph.aris_distance(author_id)
-    edge_labels = []
+    answer = forward({"query": "distance", "author_id": author_id}, reduced)
+    if answer is not None:
+        author_name = answer['author_name']
+        path = answer['path']
+    else:
+        graph = Graph(reduced)
+        author_name = graph.get_author_name(author_id)
+        print("Getting shortest path weight between {} and Aris\n".format(author_name))
+        path = graph.aris_distance(author_id)
     if path is not None:
-        aris_graph = nx.Graph()
-        aris_graph.add_node(path[0][2])
-        for i in range(0, len(path)-1):
-            current = path[i]
-            next_n = path[i+1]
-            aris_graph.add_node(next_n[2])
-            aris_graph.add_edge(current[2], next_n[2], {"weight":next_n[1]})
-            edge_labels.append(((current[2], next_n[2]), round(abs(current[1]-next_n[1]), 2)))
-        pos = nx.fruchterman_reingold_layout(aris_graph)
-        cmap = plt.cm.get_cmap('hsv', len(path)+1)
-        plt.figure(figsize=(16, 12))
-        nx.draw_networkx_edge_labels(aris_graph, pos, edge_labels=dict(edge_labels))
-        for index, value in enumerate(path):
-            color = cmap(index)
-            nx.draw_networkx(aris_graph, pos=pos, nodelist=[value[2]], node_color=color,
-                             with_labels=True, node_size=1500)
-        plt.title('Shortest path between Aris and {} = {}'\
-            .format(author_name, str(round(path[-1][1], 4))))
+        figure = plt.figure(figsize=FIGURE_SIZE)
+        draw_aris_path(figure.gca(), path, author_name)
         plt.show()
     else:
         print("There is no path between Aris and {}".format(author_name))
 
-def group_numbers(nodes_list: list, reduced: bool = False):
+def group_numbers(nodes_list: list, reduced: bool = False,
+                  output_path: str = 'group_numbers.json'):
     '''
-    Sets the group numbers for the nodes on the graph and saves locally as
-    a json file.
+    Sets the group numbers for the nodes on the graph and saves them locally
+    on output_path, as they are computed.
     The group number is the min shortest path between the node and the nodes
     on nodes_list.
     Args:
         nodes_list: an integer list with nodes id
         reduced: If reduced equals true it will use the reduced data
             to create the graph, otherwise it will use the full data
+        output_path: The path of the output, its extension is the format
+            (.json, .jsonl, .csv or .npy, see src/results.py). Authors that
+            are not connected to any node of nodes_list have no group number
+    The graph is opened from its store even when a server is running, so the
+    results are written as they are computed instead of being sent by the
+    server as a single answer
+    '''
+    graph = Graph(reduced)
+    with open_writer(output_path, 'group_number') as writer:
+        graph.export_group_numbers(nodes_list, writer)
+    print("{} available under current directory\n".format(', '.join(writer.outputs)))
+
+def aris_distances(output_path: str, reduced: bool = False):
+    '''
+    Saves the shortest distance between every author and Aris
+    Args:
+        output_path: The path of the output, its extension is the format
+            (.json, .jsonl, .csv or .npy, see src/results.py). Authors that
+            are not connected to Aris have no distance
+        reduced: If reduced equals true it will use the reduced data
+            to create the graph, otherwise it will use the full data
+    '''
+    graph = Graph(reduced)
+    with open_writer(output_path, 'distance') as writer:
+        written = graph.export_aris_distances(writer)
+    print("{} distances available under {}\n".format(str(written), ', '.join(writer.outputs)))
+
+def batch(queries_path: str, output_path: str, reduced: bool = False):
+    '''
+    Answers the queries on a file, one JSON object per line, against a single
+    graph and saves the answers as JSON lines. Nothing is plotted.
+    Each query has its name on 'query' and its arguments:
+        {"query": "subgraph", "author_id": 1, "max_hop_dist": 2}
+        {"query": "distance", "author_id": 1}
+        {"query": "distance", "author_id": 1, "target_id": 2}
+        {"query": "group_numbers", "nodes_list": [1, 2], "author_ids": [3, 4]}
+    Args:
+        queries_path: The path of the queries file, - to read from the input
+        output_path: The path of the answers file
+        reduced: If reduced equals true it will use the reduced data
+            to create the graph, otherwise it will use the full data
+    '''
+    runner = BatchRunner(Graph(reduced))
+    say("Answering queries...")
+    with open(output_path, 'w') as output:
+        if queries_path == '-':
+            answered, failed = runner.run(sys.stdin, output)
+        else:
+            with open(queries_path) as queries:
+                answered, failed = runner.run(queries, output)
+    say("{} queries answered, {} failed".format(str(answered), str(failed)))
+    say("{} available under current directory\n".format(output_path))
+
+def render_plots(jobs_path: str, output_dir: str, reduced: bool = False, fmt: str = 'png',
+                 force: bool = False):
+    '''
+    Renders the plots of the jobs on a file, one JSON object per line, to
+    image files, without a display. The plots that are up to date with the
+    saved graph are skipped
+    Each job has the name of the plot on 'plot' and its arguments:
+        {"plot": "subgraph", "author_id": 1, "max_hop_dist": 2}
+        {"plot": "distance", "author_id": 1}
+        {"plot": "conference", "conference_id": 1}
+    Args:
+        jobs_path: The path of the jobs file, - to read from the input
+        output_dir: The folder of the image files
+        reduced: If reduced equals true it will use the reduced data
+            to create the graph, otherwise it will use the full data
+        fmt: The format of the images, png or svg
+        force: If force equals true every plot is drawn again
+    '''
+    if jobs_path == '-':
+        lines = sys.stdin.readlines()
+    else:
+        with open(jobs_path) as jobs_file:
+            lines = jobs_file.readlines()
+    jobs = []
+    for line in lines:
+        if line.strip():
+            try:
+                jobs.append(json.loads(line))
+            except ValueError:
+                jobs.append({})
+    summary = render(jobs, output_dir, reduced, fmt, force=force)
+    print("{} plots rendered, {} up to date, {} failed".format(
+        str(summary['rendered']), str(summary['skipped']), str(summary['failed'])))
+    print("Plots available under {}\n".format(output_dir))
+
+def update(delta_path: str, reduced: bool = False):
+    '''
+    Adds the publications of a delta file to the saved graph
+    Args:
+        delta_path: The path to a json file with new publications, in the
+            same format as the dataset
+        reduced: If reduced equals true it will update the graph of the
+            reduced data, otherwise the graph of the full data
     '''
     graph = Graph(reduced)
-    graph.set_group_number(nodes_list)
-    with open("group_numbers.json", 'w') as jfile:
-        json.dump(graph.group_numbers, jfile)
-        print("group_numbers.json available under current directory\n")
+    summary = graph.apply_publications(delta_path)
+    print("{} authors and {} edges added, {} edges weighted\n".format(
+        str(summary['authors']), str(summary['edges']), str(summary['weighted'])))
 
-def dispatcher(exercise: str, letter: str, reduced: bool):
+def read_author_id(reduced: bool = False):
+    '''
+    Reads an author from the input, as an integer id or as a name.
+    If the name does not match exactly one author, the matching
+    authors or the authors whose name starts with it are listed
+    Args:
+        reduced: If reduced equals true it will use the reduced data
+            to look up the name, otherwise it will use the full data
+    Returns:
+        The integer id of the author
+    Raises:
+        ValueError if the input is not an id or the name of a single author
+    '''
+    text = input().strip()
+    try:
+        return int(text)
+    except ValueError:
+        pass
+    answer = forward({"query": "authors", "name": text}, reduced)
+    if answer is not None:
+        author_ids = answer['author_ids']
+        completions = answer['completions']
+    else:
+        graph = Graph(reduced)
+        author_ids = graph.find_authors(text)
+        completions = graph.complete_author_name(text) if not author_ids else []
+    if len(author_ids) == 1:
+        return author_ids[0]
+    if author_ids:
+        print("There are {} authors named {}, use one of the ids: {}"\
+            .format(len(author_ids), text, ', '.join(map(str, author_ids))))
+    else:
+        for author_id, author_name in completions:
+            print("{} - {}".format(author_id, author_name))
+    raise ValueError(text)
+
+def dispatcher(exercise: str, letter: str, reduced: bool, output_path: str = None):
     '''
     Dispatches functions to solve exercises
     Args:
         exercise: the number of the exercise as string
         letter: the letter of the exercise
         reduced: to use reduced data or not
+        output_path: the output of the exercises that save a file
     '''
     if exercise == '2' and letter == 'b':
         try:
-            print("\nInput author id: ", end="")
-            author_id = int(input())
+            print("\nInput author id or name: ", end="")
+            author_id = read_author_id(reduced)
             print("\nInput d: ", end="")
             max_hop_dist = int(input())
             viz_subgraph_author(author_id, max_hop_dist, reduced)
         except ValueError:
-            print("Author id and d should be integers")
+            print("Author should be an integer id or an author name and d should be an integer")
             sys.exit(0)
     elif exercise == '3' and letter == 'a':
         try:
-            print("\nInput author id: ", end="")
-            author_id = int(input())
+            print("\nInput author id or name: ", end="")
+            author_id = read_author_id(reduced)
             aris_distance(author_id, reduced)
         except ValueError:
-            print("Author id should be integer")
+            print("Author should be an integer id or an author name")
             sys.exit(0)
     elif exercise == '3' and letter == 'b':
         try:
             print("Input nodes list as csv [eg.: 1,2,3,4]: ", end="")
             nodes_list = list(map(int, input().split(',')))
-            group_numbers(nodes_list, reduced)
         except ValueError:
             print("nodes list should be a list of comma separated integers")
             sys.exit(0)
+        try:
+            group_numbers(nodes_list, reduced, output_path or 'group_numbers.json')
+        except ValueError as error:
+            print(str(error))
+            sys.exit(2)
     else:
         message = "Exercise does not exist. If you tried exercise 1 you can \
 just create a Graph object from the graph module. If you tried exercise 2/a, please \
@@ -141,14 +299,51 @@ def main(argv):
     exercise = ''
     letter = ''
     reduced = False
+    server = False
+    queries_path = ''
+    output_path = None
+    trace_path = None
+    delta_path = ''
+    jobs_path = ''
+    export_path = ''
+    fmt = 'png'
+    force = False
     try:
-        opts, _ = getopt.getopt(argv, "he:l:r:",
-                                ["exercise=", "letter=", "reduced="])
+        opts, _ = getopt.getopt(argv, "hsqe:l:r:b:o:t:u:p:f:",
+                                ["serve", "quiet", "exercise=", "letter=", "reduced=",
+                                 "batch=", "output=", "trace=", "update=", "plots=",
+                                 "format=", "force", "aris-distances="])
     except getopt.GetoptError:
         print('homework.py -e <exercise> -l <letter> -r <reduced>')
+        print('homework.py -s -r <reduced>')
+        print('homework.py -b <queries> -o <output> -r <reduced>')
+        print('homework.py -u <delta> -r <reduced>')
+        print('homework.py -p <jobs> -o <folder> -f <png|svg> --force -r <reduced>')
+        print('homework.py --aris-distances <output> -r <reduced>')
+        print('Add -q to hide progress messages and -t <trace> to save phase timings')
         sys.exit(2)
     for opt, arg in opts:
-        if opt in ('-e', '--exercise'):
+        if opt in ('-s', '--serve'):
+            server = True
+        elif opt in ('-q', '--quiet'):
+            set_quiet()
+        elif opt in ('-t', '--trace'):
+            trace_path = arg
+        elif opt in ('-u', '--update'):
+            delta_path = arg
+        elif opt in ('-p', '--plots'):
+            jobs_path = arg
+        elif opt in ('-f', '--format'):
+            fmt = arg
+        elif opt == '--force':
+            force = True
+        elif opt == '--aris-distances':
+            export_path = arg
+        elif opt in ('-b', '--batch'):
+            queries_path = arg
+        elif opt in ('-o', '--output'):
+            output_path = arg
+        elif opt in ('-e', '--exercise'):
             exercise = arg
         elif opt in ('-l', '--letter'):
             letter = arg
@@ -157,10 +352,30 @@ def main(argv):
                 reduced = True
             elif arg.lower() in ('0', 'false', 'f'):
                 reduced = False
-    if not exercise or not letter:
+    if fmt not in FORMATS:
+        print('Format should be one of {}'.format(', '.join(FORMATS)))
+        sys.exit(2)
+    if not server and not queries_path and not delta_path and not jobs_path and \
+            not export_path and (not exercise or not letter):
         print('homework.py -e <exercise> -l <letter> -r <reduced>')
         sys.exit(2)
-    dispatcher(exercise, letter, reduced)
+    with recording(trace_path):
+        if server:
+            serve(reduced)
+        elif queries_path:
+            batch(queries_path, output_path or 'batch_results.jsonl', reduced)
+        elif delta_path:
+            update(delta_path, reduced)
+        elif jobs_path:
+            render_plots(jobs_path, output_path or 'renders', reduced, fmt, force)
+        elif export_path:
+            try:
+                aris_distances(export_path, reduced)
+            except ValueError as error:
+                print(str(error))
+                sys.exit(2)
+        else:
+            dispatcher(exercise, letter, reduced, output_path)
 
 if __name__ == '__main__':
     main(sys.argv[1:])
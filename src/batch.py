@@ -0,0 +1,240 @@
+'''
+Module to answer many queries against a single loaded graph.
+Queries are JSON objects, one per line, with the name of the query on
+'query' and its arguments, and every answer is written as a JSON line as
+soon as it is ready. Traversals are kept and shared between queries that
+start from the same nodes, so repeated authors and seed lists are only
+expanded once
+'''
+import json
+from collections import OrderedDict
+import numpy as np
+from src.conf import ARIS, LANDMARKS
+from src.graph import Graph
+from src.instrument import span, count
+from src.results import finite
+
+CACHE_SIZE = 16
+
+class BatchRunner():
+
+    '''
+    Class to answer batch queries on the compact graph of a Graph object
+    Args:
+        graph: The Graph object used to answer the queries
+        cache_size: The number of shortest path traversals kept in memory
+    '''
+
+    def __init__(self, graph: Graph, cache_size: int = CACHE_SIZE):
+        self.graph = graph
+        self.csr = graph.store.csr
+        self.cache_size = cache_size
+        self.queries = {
+            "subgraph": self.subgraph,
+            "distance": self.distance,
+            "group_numbers": self.group_numbers,
+            "nearest": self.nearest,
+            "bounds": self.bounds
+        }
+        self.__layers = {}
+        self.__trees = OrderedDict()
+        self.__groups = OrderedDict()
+        self.__aris = None
+
+    def run(self, lines, output):
+        '''
+        Answers every query and writes the answers
+        Args:
+            lines: An iterable of JSON lines, like an open file or stdin
+            output: A writable text file for the answers
+        Returns:
+            The number of queries answered and the number of queries
+            that failed
+        '''
+        answered = 0
+        failed = 0
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            answer = self.answer(line)
+            if 'error' in answer:
+                failed += 1
+            else:
+                answered += 1
+            output.write(json.dumps(answer) + '\n')
+        return answered, failed
+
+    def answer(self, line: str):
+        '''
+        Answers a single query
+        Args:
+            line: The query as a JSON object
+        Returns:
+            The query with its answer added, or with an error message if
+            the query is not valid (with the line itself if it is not JSON)
+        '''
+        answer = {"line": line}
+        with span("batch_query") as query:
+            try:
+                request = json.loads(line)
+                answer = dict(request)
+                query.set(query=request['query'])
+                answer.update(self.queries[request['query']](request))
+            except KeyError as error:
+                answer["error"] = "Missing or unknown {}".format(str(error))
+            except (ValueError, TypeError, AttributeError) as error:
+                answer["error"] = str(error)
+        return answer
+
+    def subgraph(self, request: dict):
+        '''
+        Answers the size of the hop subgraph of author_id up to max_hop_dist
+        Returns:
+            A dict with the number of nodes at each hop distance, the total
+            and its percentage of the author component
+        '''
+        node = self.__index(request['author_id'])
+        max_hop_dist = int(request['max_hop_dist'])
+        layers = self.__layers.get(node)
+        if layers is None or len(layers) <= max_hop_dist:
+            layers = [len(layer) for layer in self.csr.bfs_layers(node, max_hop_dist)]
+            self.__layers[node] = layers
+            count(traversals=1, nodes=sum(layers))
+        else:
+            count(cache_hits=1)
+        sizes = layers[:max_hop_dist + 1]
+        components = self.graph.components
+        component_size = components['sizes'][components['labels'][node]]
+        return {
+            "layer_sizes": sizes,
+            "nodes": sum(sizes),
+            "component_percentage": round((sum(sizes)/component_size)*100, 2)
+        }
+
+    def distance(self, request: dict):
+        '''
+        Answers the shortest path weight between author_id and target_id,
+        or Aris if target_id is not set. The traversal is run from the
+        target, so queries to the same target share it
+        Returns:
+            A dict with the distance, None if there is no path
+        '''
+        node = self.__index(request['author_id'])
+        if request.get('target_id') is None:
+            dist = self.__aris_distances()
+            if dist is None:
+                raise ValueError("Aris not found")
+        else:
+            target = self.__index(request['target_id'])
+            labels = self.graph.components['labels']
+            if labels[node] != labels[target]:
+                return {"distance": None}
+            if node in self.__trees and target not in self.__trees:
+                node, target = target, node
+            dist = self.__cached(self.__trees, target,
+                                 lambda: self.csr.dijkstra(target)[0])
+        return {"distance": finite(float(dist[node]))}
+
+    def nearest(self, request: dict):
+        '''
+        Answers the authors closest to author_id within radius, the k
+        closest ones, or both, as in Graph.nearest_authors
+        Returns:
+            A dict with the list of [author id, distance] sorted by distance
+        '''
+        node = self.__index(request['author_id'])
+        radius = request.get('radius')
+        k = request.get('k')
+        if radius is None and k is None:
+            raise ValueError("Either radius or k must be set")
+        nodes, dist = self.csr.bounded_dijkstra(node, None if radius is None else float(radius),
+                                                None if k is None else int(k))
+        count(traversals=1, nodes=len(nodes))
+        return {"nearest": [[author_id, value] for author_id, value
+                            in zip(self.csr.to_ids(nodes[1:]), dist[1:].tolist())]}
+
+    def bounds(self, request: dict):
+        '''
+        Answers a lower and an upper bound of the shortest path weight
+        between author_id and target_id from the landmark oracle of the graph
+        Returns:
+            A dict with the bounds, None if there is no path
+        '''
+        node = self.__index(request['author_id'])
+        target = self.__index(request['target_id'])
+        labels = self.graph.components['labels']
+        if labels[node] != labels[target]:
+            return {"lower": None, "upper": None}
+        oracle = self.graph.landmarks(int(request.get('landmarks', LANDMARKS)),
+                                      request.get('strategy', 'degree'))
+        lower, upper = oracle.bounds(node, target)
+        return {"lower": finite(lower), "upper": finite(upper)}
+
+    def group_numbers(self, request: dict):
+        '''
+        Answers the group numbers of the nodes on nodes_list. Only the
+        authors on author_ids are written if it is set. As in
+        Graph.set_group_number, the nodes that are not on graph are left out,
+        and if none is on graph no author is reachable
+        Returns:
+            A dict with the group number and the closest node of nodes_list
+            of each author, None if it is not reachable
+        '''
+        seeds = {int(node) for node in request['nodes_list']}
+        sources = tuple(sorted(self.csr.index_of(node) for node in seeds if node in self.csr))
+        if sources:
+            dist, origin = self.__cached(
+                self.__groups, sources, lambda: self.csr.multi_source_dijkstra(list(sources))[::2])
+        else:
+            dist = np.full(len(self.csr), np.inf)
+            origin = np.full(len(self.csr), -1, dtype=np.int64)
+        if request.get('author_ids') is None:
+            nodes = np.arange(len(self.csr))
+        else:
+            nodes = np.array([self.__index(node) for node in request['author_ids']],
+                             dtype=np.int64)
+        ids = self.csr.to_ids(nodes)
+        closest = origin[nodes]
+        closest_ids = self.csr.to_ids(np.maximum(closest, 0))
+        return {
+            "group_numbers": {author_id: finite(value) for author_id, value
+                              in zip(ids, dist[nodes].tolist())},
+            "group_sources": {author_id: (source if index >= 0 else None) for author_id,
+                              source, index in zip(ids, closest_ids, closest.tolist())}
+        }
+
+    def __index(self, author_id):
+        '''
+        Gets the dense index of an author, checking it is on the graph
+        '''
+        author_id = int(author_id)
+        if author_id not in self.csr:
+            raise ValueError("Author id {} does not exist on graph".format(str(author_id)))
+        return self.csr.index_of(author_id)
+
+    def __cached(self, cache: OrderedDict, key, compute):
+        '''
+        Gets a value from a least recently used cache, computing it if it
+        is not there
+        '''
+        if key in cache:
+            cache.move_to_end(key)
+            count(cache_hits=1)
+            return cache[key]
+        count(traversals=1)
+        value = compute()
+        cache[key] = value
+        if len(cache) > self.cache_size:
+            cache.popitem(last=False)
+        return value
+
+    def __aris_distances(self):
+        '''
+        Gets the distance between every node and Aris, from his shortest path tree
+        '''
+        if self.__aris is None:
+            aris_nodes = self.graph.find_authors(ARIS)
+            if aris_nodes:
+                self.__aris = self.graph.shortest_path_tree(aris_nodes[0])['distances']
+        return self.__aris
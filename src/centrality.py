@@ -0,0 +1,254 @@
+'''
+Module to compute closeness and betweenness centralities in parallel.
+The source nodes are split across a pool of processes, each process runs
+Brandes algorithm (weighted, with Dijkstra) from its sources on a compact
+copy of the graph, and the partial betweenness sums are added at the end.
+The results are the same as NetworkX closeness_centrality and
+betweenness_centrality with weights, up to floating point rounding.
+The approximate mode only runs from a random sample of pivot nodes and
+reports bounds for the error of its estimates
+'''
+import os
+import math
+import heapq as hp
+from itertools import count
+from multiprocessing import Pool
+import numpy as np
+import networkx as nx
+from scipy.sparse.csgraph import connected_components
+from src.csr import CSRGraph
+
+_ADJACENCY = None
+
+def centralities(graph: nx.Graph, workers: int = None):
+    '''
+    Gets degree, closeness and betweenness centralities of a graph
+    Args:
+        graph: The NetworkX graph to get the measures from, with weighted edges
+        workers: The number of processes to use, all the cores if it is not set.
+            With one worker everything runs on the current process
+    Returns:
+        A tuple of dictionaries with degree, closeness and
+        betweenness centralities for each node on graph
+    '''
+    csr = CSRGraph.from_networkx(graph, dtype=np.float64)
+    partials = _run(_centrality_chunk, csr, list(range(len(csr))), workers)
+    nodes = len(csr)
+    betweenness = np.zeros(nodes)
+    closeness = {}
+    for partial_betweenness, partial_closeness in partials:
+        betweenness += partial_betweenness
+        closeness.update(partial_closeness)
+    if nodes > 2:
+        betweenness *= 1 / ((nodes - 1) * (nodes - 2))
+    ids = csr.to_ids(slice(None))
+    degree = nx.degree(graph)
+    closeness = {ids[node]: value for node, value in closeness.items()}
+    betweenness = dict(zip(ids, betweenness.tolist()))
+    return degree, closeness, betweenness
+
+def approximate_centralities(graph: nx.Graph, samples: int = None, epsilon: float = None,
+                             delta: float = 0.1, seed: int = 0, workers: int = None):
+    '''
+    Estimates closeness and betweenness centralities from a sample of pivot
+    nodes, picked uniformly at random. Betweenness adds the dependencies of
+    the pivots scaled by nodes/samples. Closeness uses the mean distance
+    between each node and the pivots on its connected component, with the
+    exact size of the component. The bounds hold for all the nodes at once
+    with probability at least 1 - delta (Hoeffding inequality and union bound)
+    Args:
+        graph: The NetworkX graph to get the measures from, with weighted edges
+        samples: The number of pivots
+        epsilon: The target error of betweenness, used to choose the number of
+            pivots when samples is not set
+        delta: The probability that the bounds do not hold
+        seed: The seed of the random choice of pivots
+        workers: The number of processes to use, all the cores if it is not set
+    Returns:
+        A tuple with the degree, closeness and betweenness dicts and a dict
+        with the bounds: 'betweenness' is the additive error of every
+        betweenness, 'closeness' is a dict with the additive error of the
+        closeness of each node (inf when the sample is too small to bound it),
+        'confidence' is 1 - delta and 'samples' the number of pivots used
+    '''
+    csr = CSRGraph.from_networkx(graph, dtype=np.float64)
+    nodes = len(csr)
+    log_term = math.log(2 * max(nodes, 1) / delta)
+    if samples is None:
+        if epsilon is None:
+            raise ValueError("Either samples or epsilon must be set")
+        samples = math.ceil((nodes / max(nodes - 1, 1)) ** 2 * log_term / (2 * epsilon ** 2))
+    if nodes == 0:
+        bounds = {'betweenness': 0.0, 'closeness': {}, 'confidence': 1 - delta, 'samples': 0}
+        return nx.degree(graph), {}, {}, bounds
+    samples = max(1, min(samples, nodes))
+    pivots = np.random.RandomState(seed).choice(nodes, samples, replace=False).tolist()
+    partials = _run(_sampled_chunk, csr, pivots, workers)
+    betweenness = np.zeros(nodes)
+    dist_sums = np.zeros(nodes)
+    reached = np.zeros(nodes)
+    eccentricity = {}
+    for partial in partials:
+        betweenness += partial[0]
+        dist_sums += partial[1]
+        reached += partial[2]
+        eccentricity.update(partial[3])
+    if nodes > 2:
+        betweenness *= nodes / samples / ((nodes - 1) * (nodes - 2))
+    _, labels = connected_components(csr.matrix(), directed=False)
+    component_sizes = np.bincount(labels)
+    # The distance between two nodes of a component is at most twice the
+    # eccentricity of any pivot on it
+    diameter = [math.inf] * len(component_sizes)
+    for pivot, ecc in eccentricity.items():
+        diameter[labels[pivot]] = min(diameter[labels[pivot]], 2 * float(ecc))
+    closeness = {}
+    closeness_bounds = {}
+    ids = csr.to_ids(slice(None))
+    for node in range(nodes):
+        reach = int(component_sizes[labels[node]]) - 1
+        scale = reach / (nodes - 1) if nodes > 1 else 0.0
+        # The node itself does not count as a sample of its mean distance
+        pivot_samples = float(reached[node])
+        if pivot_samples == 0 or dist_sums[node] == 0:
+            closeness[ids[node]] = 0.0
+            closeness_bounds[ids[node]] = 0.0 if reach == 0 else math.inf
+            continue
+        mean = float(dist_sums[node]) / pivot_samples
+        error = diameter[labels[node]] * math.sqrt(log_term / (2 * pivot_samples))
+        closeness[ids[node]] = scale / mean
+        closeness_bounds[ids[node]] = scale * (1 / (mean - error) - 1 / mean) \
+            if mean > error else math.inf
+    bounds = {
+        'betweenness': (nodes / max(nodes - 1, 1)) * math.sqrt(log_term / (2 * samples))
+                       if samples < nodes else 0.0,
+        'closeness': closeness_bounds if samples < nodes
+                     else dict.fromkeys(closeness_bounds, 0.0),
+        'confidence': 1 - delta,
+        'samples': samples
+    }
+    degree = nx.degree(graph)
+    return degree, closeness, dict(zip(ids, betweenness.tolist())), bounds
+
+def _run(function, csr: CSRGraph, sources: list, workers: int = None):
+    '''
+    Runs function over chunks of sources, on a pool of processes that
+    have the adjacency of csr
+    Returns:
+        The list with the result of each chunk
+    '''
+    workers = workers or os.cpu_count() or 1
+    adjacency = (csr.indptr.tolist(), csr.indices.tolist(), csr.weights.tolist())
+    chunks = [sources[i::workers * 4] for i in range(min(len(sources), workers * 4))]
+    if workers == 1 or len(chunks) <= 1:
+        _init_worker(adjacency)
+        return [function(chunk) for chunk in chunks]
+    with Pool(workers, initializer=_init_worker, initargs=(adjacency,)) as pool:
+        return pool.map(function, chunks)
+
+def _init_worker(adjacency: tuple):
+    '''
+    Keeps the adjacency lists of the graph on the worker process
+    '''
+    global _ADJACENCY
+    _ADJACENCY = adjacency
+
+def _centrality_chunk(sources: list):
+    '''
+    Runs Brandes algorithm from each node on sources
+    Args:
+        sources: A list with the dense indices of the source nodes
+    Returns:
+        A tuple with the partial (not normalized) betweenness of every node as a
+        list and a dict with the closeness of each source
+    '''
+    indptr, indices, weights = _ADJACENCY
+    nodes = len(indptr) - 1
+    betweenness = [0.0] * nodes
+    closeness = {}
+    for source in sources:
+        order, preds, sigma, dists = _dijkstra_paths(source)
+        total = sum(dists.values())
+        if total > 0 and nodes > 1:
+            reached = len(dists) - 1
+            closeness[source] = (reached / total) * (reached / (nodes - 1))
+        else:
+            closeness[source] = 0.0
+        _accumulate(betweenness, order, preds, sigma, source)
+    return betweenness, closeness
+
+def _sampled_chunk(pivots: list):
+    '''
+    Runs Brandes algorithm from each node on pivots
+    Args:
+        pivots: A list with the dense indices of the pivot nodes
+    Returns:
+        A tuple with the partial (not normalized) betweenness of every node,
+        the sum of the distances between every node and the pivots, the
+        number of pivots that reached every node (other than itself) and
+        a dict with the eccentricity of each pivot
+    '''
+    nodes = len(_ADJACENCY[0]) - 1
+    betweenness = [0.0] * nodes
+    dist_sums = np.zeros(nodes)
+    reached = np.zeros(nodes)
+    eccentricity = {}
+    for pivot in pivots:
+        order, preds, sigma, dists = _dijkstra_paths(pivot)
+        others = np.fromiter(dists.keys(), dtype=np.int64, count=len(dists))
+        dist_sums[others] += np.fromiter(dists.values(), dtype=np.float64, count=len(dists))
+        reached[others] += 1
+        reached[pivot] -= 1
+        eccentricity[pivot] = max(dists.values())
+        _accumulate(betweenness, order, preds, sigma, pivot)
+    return betweenness, dist_sums, reached, eccentricity
+
+def _accumulate(betweenness: list, order: list, preds: dict, sigma: dict, source: int):
+    '''
+    Adds the dependencies of source on every node to betweenness
+    '''
+    delta = dict.fromkeys(order, 0)
+    while order:
+        node = order.pop()
+        coeff = (1 + delta[node]) / sigma[node]
+        for pred in preds[node]:
+            delta[pred] += sigma[pred] * coeff
+        if node != source:
+            betweenness[node] += delta[node]
+
+def _dijkstra_paths(source: int):
+    '''
+    Dijkstra algorithm counting the shortest paths from source, in the same
+    way as NetworkX does for betweenness centrality
+    Returns:
+        A tuple with the nodes in the order they were settled, the shortest
+        path predecessors of each node, the number of shortest paths to each
+        node and the distance to each node
+    '''
+    indptr, indices, weights = _ADJACENCY
+    order = []
+    preds = {source: []}
+    sigma = {source: 1.0}
+    dists = {}
+    seen = {source: 0}
+    counter = count()
+    p_queue = [(0, next(counter), source, source)]
+    while p_queue:
+        dist, _, pred, node = hp.heappop(p_queue)
+        if node in dists:
+            continue
+        sigma[node] += sigma[pred]
+        order.append(node)
+        dists[node] = dist
+        for k in range(indptr[node], indptr[node + 1]):
+            neighbour = indices[k]
+            _dist = dist + weights[k]
+            if neighbour not in dists and (neighbour not in seen or _dist < seen[neighbour]):
+                seen[neighbour] = _dist
+                hp.heappush(p_queue, (_dist, next(counter), node, neighbour))
+                sigma[neighbour] = 0.0
+                preds[neighbour] = [node]
+            elif _dist == seen[neighbour]:
+                sigma[neighbour] += sigma[node]
+                preds[neighbour].append(node)
+    return order, preds, sigma, dists
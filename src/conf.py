@@ -4,5 +4,10 @@ Configuration variables for the project
 DATA_FOLDER = "data"
 FULL_DATA = "{}/full_dblp.json".format(DATA_FOLDER)
 RED_DATA = "{}/reduced_dblp.json".format(DATA_FOLDER)
-GRAPH = "{}/graph".format(DATA_FOLDER)
-RED_GRAPH = "{}/red_graph".format(DATA_FOLDER)
+GRAPH = "{}/graph_store".format(DATA_FOLDER)
+RED_GRAPH = "{}/red_graph_store".format(DATA_FOLDER)
+ARIS = "Aris Anagnostopoulos"
+WORKERS = None
+LANDMARKS = 16
+SERVER_HOST = "127.0.0.1"
+SERVER_PORT = 8765
@@ -0,0 +1,288 @@
+'''
+Module with a compact array representation of the co-authorship graph.
+Author ids are mapped to dense integer indices and the adjacency is kept
+as CSR arrays, so the graph algorithms run on NumPy/SciPy arrays instead
+of the NetworkX dict-of-dicts
+'''
+import math
+import heapq as hp
+import numpy as np
+from scipy.sparse import csr_matrix
+from scipy.sparse.csgraph import dijkstra
+
+class CSRGraph():
+
+    '''
+    Class to hold a weighted undirected graph as CSR arrays.
+    The arrays can be memory mapped, they are never copied
+    Args:
+        ids: Sorted array with the author id of each dense index
+        indptr: CSR row pointer array, of length len(ids) + 1
+        indices: CSR column array with the dense index of each neighbour
+        weights: Array with the weight of each entry on indices
+    '''
+
+    def __init__(self, ids, indptr, indices, weights):
+        self.ids = ids
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.__matrix = None
+
+    @classmethod
+    def from_networkx(cls, graph, dtype=np.float64):
+        '''
+        Builds the compact representation from a NetworkX graph
+        Args:
+            graph: A NetworkX graph whose edges have a weight attribute
+            dtype: The NumPy type of the weights array. The default keeps the
+                weights exactly as they are on graph, np.float32 halves the
+                weights array at the cost of rounding them
+        Returns:
+            A CSRGraph object
+        '''
+        ids = np.sort(np.fromiter(graph.nodes(), dtype=np.int64,
+                                  count=graph.number_of_nodes()))
+        index = {author_id: i for i, author_id in enumerate(ids.tolist())}
+        indptr = [0]
+        indices = []
+        weights = []
+        for author_id in ids.tolist():
+            for neighbour, edge in graph.adj[author_id].items():
+                indices.append(index[neighbour])
+                weights.append(edge['weight'])
+            indptr.append(len(indices))
+        # Both index arrays share a dtype so SciPy does not copy them
+        index_dtype = np.int32 if len(indices) < 2**31 else np.int64
+        indptr = np.array(indptr, dtype=index_dtype)
+        indices = np.array(indices, dtype=index_dtype)
+        weights = np.array(weights, dtype=dtype)
+        return cls(ids, indptr, indices, weights)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def __contains__(self, author_id):
+        position = np.searchsorted(self.ids, author_id)
+        return position < len(self.ids) and self.ids[position] == author_id
+
+    def index_of(self, author_id: int):
+        '''
+        Gets the dense index of an author
+        Args:
+            author_id: The integer id of an author
+        Returns:
+            The dense index of the author
+        Raises:
+            KeyError if author_id is not on the graph
+        '''
+        if author_id not in self:
+            raise KeyError(author_id)
+        return int(np.searchsorted(self.ids, author_id))
+
+    def matrix(self):
+        '''
+        Gets the adjacency as a SciPy sparse matrix sharing the CSR arrays.
+        Every edge is stored in both directions and zero weights are explicit
+        entries, so they are kept as edges
+        '''
+        if self.__matrix is None:
+            self.__matrix = csr_matrix((self.weights, self.indices, self.indptr),
+                                       shape=(len(self), len(self)), copy=False)
+        return self.__matrix
+
+    def neighbours(self, node: int):
+        '''
+        Gets the dense indices and weights of the neighbours of a node
+        Args:
+            node: The dense index of the node
+        Returns:
+            A tuple with the neighbours array and the weights array
+        '''
+        start, end = self.indptr[node], self.indptr[node + 1]
+        return self.indices[start:end], self.weights[start:end]
+
+    def dijkstra(self, source: int):
+        '''
+        Dijkstra algorithm from a single source
+        Args:
+            source: The dense index of the root node
+        Returns:
+            A tuple with an array of distances (inf if unreachable) and an
+            array of predecessors (negative if there is none)
+        '''
+        dist, pred = dijkstra(self.matrix(), directed=True, indices=source,
+                              return_predecessors=True)
+        return dist, pred
+
+    def bounded_dijkstra(self, source: int, radius: float = None, k: int = None):
+        '''
+        Dijkstra algorithm from a single source that stops as soon as its
+        bound is settled, so it only expands the nodes of the answer. Nodes
+        further than radius are never pushed to the heap
+        Args:
+            source: The dense index of the root node
+            radius: The maximum distance of the settled nodes
+            k: The maximum number of settled nodes, besides source
+        Returns:
+            A tuple with an array of the settled nodes, starting with source
+            and sorted by distance (ties by index), and an array with their
+            distances
+        '''
+        indptr, indices, weights = self.indptr, self.indices, self.weights
+        limit = math.inf if radius is None else radius
+        size = math.inf if k is None else k + 1
+        distances = {source: 0.0}
+        settled = []
+        settled_dist = []
+        p_queue = [(0.0, source)]
+        while p_queue and len(settled) < size:
+            dist, node = hp.heappop(p_queue)
+            if dist > distances[node]:
+                continue
+            settled.append(node)
+            settled_dist.append(dist)
+            start, end = indptr[node], indptr[node + 1]
+            for neighbour, weight in zip(indices[start:end].tolist(),
+                                         weights[start:end].tolist()):
+                _dist = dist + weight
+                if _dist <= limit and _dist < distances.get(neighbour, math.inf):
+                    distances[neighbour] = _dist
+                    hp.heappush(p_queue, (_dist, neighbour))
+        return np.array(settled, dtype=np.int64), np.array(settled_dist, dtype=np.float64)
+
+    def multi_source_dijkstra(self, sources: list):
+        '''
+        Dijkstra algorithm from several sources in a single traversal
+        Args:
+            sources: The list of dense indices of the root nodes
+        Returns:
+            A tuple with an array of distances to the closest source, an
+            array of predecessors and an array with the closest source of
+            each node (negative if there is none)
+        '''
+        dist, pred, origin = dijkstra(self.matrix(), directed=True, indices=sources,
+                                      return_predecessors=True, min_only=True)
+        return dist, pred, origin
+
+    def bfs_layers(self, source: int, max_hop_dist: int, max_nodes: int = None):
+        '''
+        Level synchronous breadth first search by hop distance. Each level
+        expands the whole frontier at once with array operations, and a
+        visited bitmap keeps every node on a single layer
+        Args:
+            source: The dense index of the root node
+            max_hop_dist: The maximum hop distance to expand
+            max_nodes: The maximum number of nodes on all the layers. The
+                layer that reaches it keeps only its nodes with the lowest
+                indices, and the next layers are empty
+        Returns:
+            A list of length max_hop_dist + 1 where element i is an array
+            with the dense indices of the nodes at hop distance i from source
+        '''
+        visited = np.zeros(len(self), dtype=bool)
+        visited[source] = True
+        frontier = np.array([source], dtype=np.int64)
+        layers = [frontier]
+        budget = np.inf if max_nodes is None else max_nodes - 1
+        for _ in range(max_hop_dist):
+            if len(frontier) == 0 or budget <= 0:
+                break
+            frontier = np.unique(self.__expand(frontier, visited))
+            if len(frontier) > budget:
+                frontier = frontier[:int(budget)]
+            budget -= len(frontier)
+            visited[frontier] = True
+            layers.append(frontier)
+        empty = np.zeros(0, dtype=np.int64)
+        layers.extend(empty for _ in range(max_hop_dist + 1 - len(layers)))
+        return layers
+
+    def hop_histograms(self, sources: list, max_hop_dist: int):
+        '''
+        Counts the nodes at each hop distance from many roots, without
+        keeping the layers. The roots are searched 64 at a time: every node
+        has a 64 bit word with one bit per root, and each level ORs the words
+        of the frontier into their neighbours
+        Args:
+            sources: A list with the dense indices of the roots
+            max_hop_dist: The maximum hop distance to count
+        Returns:
+            An array of shape (len(sources), max_hop_dist + 1) with the
+            number of nodes at each hop distance from each root
+        '''
+        histograms = np.zeros((len(sources), max_hop_dist + 1), dtype=np.int64)
+        has_neighbours = np.diff(self.indptr) > 0
+        starts = self.indptr[:-1][has_neighbours]
+        for batch in range(0, len(sources), 64):
+            roots = np.asarray(sources[batch:batch + 64], dtype=np.int64)
+            bits = np.left_shift(np.uint64(1), np.arange(len(roots), dtype=np.uint64))
+            frontier = np.zeros(len(self), dtype=np.uint64)
+            np.bitwise_or.at(frontier, roots, bits)
+            visited = frontier.copy()
+            histograms[batch:batch + len(roots), 0] = 1
+            for hop in range(1, max_hop_dist + 1):
+                reached = np.zeros(len(self), dtype=np.uint64)
+                if len(starts):
+                    reached[has_neighbours] = np.bitwise_or.reduceat(
+                        frontier[self.indices], starts)
+                frontier = reached & ~visited
+                changed = frontier[frontier != 0]
+                if len(changed) == 0:
+                    break
+                visited |= frontier
+                # Bit b of the words is set on the nodes at this hop from root b
+                counts = np.unpackbits(changed.astype('<u8').view(np.uint8).reshape(-1, 8),
+                                       axis=1, bitorder='little').sum(axis=0)
+                histograms[batch:batch + len(roots), hop] = counts[:len(roots)]
+        return histograms
+
+    def induced_edges(self, nodes):
+        '''
+        Gets the edges between a set of nodes, reading only their rows
+        Args:
+            nodes: A sorted array with the dense indices of the nodes
+        Returns:
+            A tuple with an array with the first node, an array with the
+            second node and an array with the weight of each edge. Each edge
+            is there once, on the row of its first node, which is not greater
+            than the second, in the order of the rows
+        '''
+        nodes = np.asarray(nodes, dtype=np.int64)
+        positions, indptr = row_positions(self.indptr, nodes)
+        sources = np.repeat(nodes, np.diff(indptr))
+        targets = self.indices[positions].astype(np.int64)
+        found = np.minimum(np.searchsorted(nodes, targets), max(len(nodes) - 1, 0))
+        keep = (targets >= sources)
+        if len(nodes):
+            keep &= nodes[found] == targets
+        return sources[keep], targets[keep], self.weights[positions[keep]]
+
+    def __expand(self, frontier, visited):
+        '''
+        Gets the neighbours of the frontier that were not visited, with repetitions
+        '''
+        neighbours = self.indices[row_positions(self.indptr, frontier)[0]]
+        return neighbours[~visited[neighbours]]
+
+    def to_ids(self, nodes):
+        '''
+        Maps an array of dense indices back to author ids
+        '''
+        return self.ids[nodes].tolist()
+
+def row_positions(indptr, rows):
+    '''
+    Gets the positions of the entries of some rows of a CSR array
+    Args:
+        indptr: The row pointer array
+        rows: An array with the rows
+    Returns:
+        A tuple with an array with the positions of the entries of the rows,
+        one row after the other, and the row pointer array of those rows alone
+    '''
+    starts = np.asarray(indptr[rows], dtype=np.int64)
+    lengths = np.asarray(indptr[np.asarray(rows) + 1], dtype=np.int64) - starts
+    local = np.zeros(len(starts) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=local[1:])
+    return np.repeat(starts - local[:-1], lengths) + np.arange(local[-1]), local
@@ -2,119 +2,208 @@
 Module to create and manipulate the graph
 Set configurations on the conf.py file
 '''
+import os
 import sys
-import json
-import pickle
 import heapq as hp
-import tqdm
+import numpy as np
 import networkx as nx
-from src.conf import FULL_DATA, RED_DATA, GRAPH, RED_GRAPH
+from scipy.sparse.csgraph import connected_components
+from src.conf import FULL_DATA, RED_DATA, GRAPH, RED_GRAPH, ARIS, WORKERS, LANDMARKS
+from src.centrality import centralities, approximate_centralities
+from src.csr import CSRGraph
+from src.ingest import iter_publications, resolve_data_path
+from src.instrument import span, spanned, count, say, progress
+from src.landmarks import LandmarkOracle
+from src.layout import LayoutCache
+from src.names import NameIndex
+from src.records import Catalog, NodeData
+from src.store import GraphStore, fingerprint
+from src.weights import jaccard_weights
 
 class Graph():
 
     '''
     Class to create and manipulate a graph using the NetworkX package
-    The graph object is accessible through the graph attribute
+    The graph object is accessible through the graph attribute. The graph is
+    saved locally as a GraphStore, and when it is loaded from it the NetworkX
+    object is only created the first time the graph attribute is used. The
+    searches on the whole graph read the CSR arrays of the store and the
+    subgraphs are built from the rows of their authors, so queries never
+    create it.
     Args:
         reduced: If reduced equals true it will use the reduced data
             to create the graph, otherwise it will use the full data
+        compact: If compact equals true the CSRGraph of the store is available
+            through the csr attribute, and shortest_path and set_group_number
+            run against it instead of NetworkX
     '''
 
-    def __init__(self, reduced: bool = False):
+    def __init__(self, reduced: bool = False, compact: bool = False):
+        data = resolve_data_path(RED_DATA if reduced else FULL_DATA)
+        self._graph = None
+        self.__name_index = None
+        self.__components = None
+        self.__landmarks = {}
         try:
-            print("\nTrying to load graph from local file")
-            self.graph = self.__load_graph(reduced)
-            print("\nGraph loaded\n")
+            say("\nTrying to load graph from local file")
+            with span("load", reduced=reduced) as load:
+                self.store = self.__load_graph(data, reduced)
+                load.count(nodes=len(self.store.csr), edges=int(self.store.csr.indptr[-1]) // 2)
+            say("\nGraph loaded\n")
         except FileNotFoundError:
-            print("\nGraph not found, will create graph from dataset\n")
-            data = RED_DATA if reduced else FULL_DATA
-            self.graph = self.__create_graph(data)
-            self.__save_graph(reduced)
-            print("\nFinished\n")
+            say("\nGraph not found, will create graph from dataset\n")
+            self._graph = self.__create_graph(data)
+            self.store = self.__save_graph(data, reduced)
+            say("\nFinished\n")
+        self.csr = self.store.csr if compact else None
         self.group_numbers = {}
+        self.group_sources = {}
+
+    @property
+    def graph(self):
+        '''
+        The NetworkX graph object
+        '''
+        if self._graph is None:
+            with span("materialize"):
+                self._graph = self.store.to_networkx()
+        return self._graph
 
     def __create_graph(self, data_path: str):
         '''
         Function to create the graph using NetworkX.
+        The publications are streamed from the file, so only the graph
+        is kept in memory. The publications and conferences are kept on the
+        Catalog of the graph (graph.graph['catalog']) and each node has a
+        NodeData with their ids.
         Args:
-            data_path: The path to the json file with the graph data
+            data_path: The path to the json file with the graph data, it can
+                be gzip compressed
         Returns:
             A NetworkX graph object
         '''
-        with open(data_path) as data_file:
-            data = json.load(data_file)
+        with span("ingest", data_path=data_path) as ingest:
+            graph = self.__read_publications(data_path)
+            ingest.count(nodes=graph.number_of_nodes(), edges=graph.number_of_edges())
+        graph = self.__add_weights(graph)
+        return graph
 
-        graph = nx.Graph()
+    def __read_publications(self, data_path: str):
+        '''
+        Creates the graph without weights from the publications on data_path
+        '''
+        graph = nx.Graph(catalog=Catalog())
+        self.__add_publications(graph, progress(iter_publications(data_path),
+                                                desc="Creating graph..."))
+        return graph
 
-        for entry in tqdm.tqdm(data, desc="Creating graph..."):
-            conference = {
-                "id_str":entry["id_conference"],
-                "id_int":entry["id_conference_int"]
-            }
-            publication = {
-                "id_str": entry["id_publication"],
-                "id_int": entry["id_publication_int"],
-                "title": entry["title"]
-            }
+    def __add_publications(self, graph: nx.Graph, entries):
+        '''
+        Adds publications to the graph, with an edge without weight between
+        every two authors of each publication
+        Args:
+            graph: The NetworkX graph, with its Catalog
+            entries: An iterable of publications as they are on the dataset
+        Returns:
+            The set of the authors of the publications
+        '''
+        catalog = graph.graph['catalog']
+        publications = 0
+        authors = set()
+        for entry in entries:
+            publications += 1
+            conference_id = catalog.add_conference(entry["id_conference"],
+                                                   entry["id_conference_int"])
+            publication_id = catalog.add_publication(entry["id_publication"],
+                                                     entry["id_publication_int"],
+                                                     entry["title"])
             nodes_id = []
 
             for author in entry["authors"]:
                 try:
-                    node = graph.node[author["author_id"]]["data"]
+                    node = graph.nodes[author["author_id"]]["data"]
                 except KeyError:
-                    new_author = {
-                        "name": author["author"],
-                        "id": author["author_id"]
-                    }
-                    node = {
-                        "author": new_author,
-                        "publications": {},
-                        "conferences": {}
-                    }
+                    node = NodeData(author["author_id"], author["author"], catalog)
+                    graph.add_node(author["author_id"], data=node)
 
-                    graph.add_node(new_author['id'], data=node)
-
-                node['publications'][publication['id_int']] = publication
-                node['conferences'][conference['id_int']] = conference
+                node.add(publication_id, conference_id)
+                authors.add(author["author_id"])
 
                 if nodes_id:
                     for node_id in nodes_id:
                         graph.add_edge(node_id, author["author_id"], weight=None)
                 nodes_id.append(author["author_id"])
+        for author_id in authors:
+            graph.nodes[author_id]['data'].compact()
+        count(publications=publications)
+        return authors
 
-        graph = self.__add_weights(graph)
-        return graph
-
-
-    def __add_weights(self, graph):
+    def __add_weights(self, graph, edges_ids: list = None):
         '''
         Function to add weights to the graph object.
-        The weights are added as 1 - jaccard similarity between two connected nodes
-        '''
-        edges_ids = graph.edges()
-        for node_id1, node_id2 in tqdm.tqdm(edges_ids, desc="Adding weights..."):
-            node1 = graph.node[node_id1]["data"]
-            node2 = graph.node[node_id2]["data"]
-            weight = self.__weight(node1, node2)
-            graph[node_id1][node_id2]["weight"] = weight
+        The weights are added as 1 - jaccard similarity between two connected nodes,
+        calculated for all the edges at once by jaccard_weights
+        Args:
+            graph: The NetworkX graph
+            edges_ids: The edges to weight, all the edges if it is not set
+        '''
+        with span("weighting") as weighting:
+            if edges_ids is None:
+                edges_ids = list(graph.edges())
+            weights = jaccard_weights(graph, edges_ids)
+            for (node_id1, node_id2), weight in progress(zip(edges_ids, weights),
+                                                         total=len(edges_ids),
+                                                         desc="Adding weights..."):
+                graph[node_id1][node_id2]["weight"] = weight
+            weighting.count(edges=len(edges_ids))
         return graph
 
-    def __weight(self, node1, node2):
+    def apply_publications(self, delta_path: str):
         '''
-        Calculates 1 - jaccard similarity between two nodes.
-        The jaccard similarity is calculated as the number of publications in common
-        divided by the number of total publications between two authors.
-        Args
-            node1: A node from a NetworkX graph
-            node2: A node from a NetworkX graph
+        Adds the publications of a delta file to the graph and saves it.
+        New authors and edges are added, and only the weights of the edges
+        of the authors of the new publications are calculated again, since
+        the weights of the others did not change. A delta that was already
+        applied to the store is skipped
+        Args:
+            delta_path: The path to a json file with the same format as the
+                dataset, it can be gzip compressed
         Returns:
-            1 - jaccard similarity between node1 and node2
+            A dict with the number of authors and edges added and of
+            edges weighted
         '''
-        pubs1 = set(node1['publications'].keys())
-        pubs2 = set(node2['publications'].keys())
-        weight = 1 - (len(pubs1.intersection(pubs2))/len(pubs1.union(pubs2)))
-        return weight
+        delta = fingerprint(delta_path)
+        applied = self.store.meta.get('deltas', [])
+        if any(previous['hash'] == delta['hash'] for previous in applied):
+            say("Delta {} was already applied".format(delta_path))
+            return {"authors": 0, "edges": 0, "weighted": 0}
+        with span("update", delta_path=delta_path) as update:
+            graph = self.graph
+            nodes, edges = graph.number_of_nodes(), graph.number_of_edges()
+            authors = self.__add_publications(graph, progress(iter_publications(delta_path),
+                                                              desc="Adding publications..."))
+            # Each edge between two authors of the delta is weighted once
+            edges_ids = sorted({(min(edge), max(edge)) for edge in graph.edges(authors)})
+            self.__add_weights(graph, edges_ids)
+            summary = {
+                "authors": graph.number_of_nodes() - nodes,
+                "edges": graph.number_of_edges() - edges,
+                "weighted": len(edges_ids)
+            }
+            update.count(**summary)
+            with span("save", path=self.store.path):
+                store = GraphStore.from_networkx(graph, self.store.meta.get('source'))
+                store.meta['deltas'] = applied + [delta]
+                store.save(self.store.path)
+        self.store = store
+        if self.csr is not None:
+            self.csr = store.csr
+        self.__name_index = None
+        self.__components = None
+        self.__landmarks = {}
+        return summary
 
+    @spanned("get_subgraph_conf")
     def get_subgraph_conf(self, conference_id: int):
         '''
         Gets the sugraph induced by the set of authors who published at
@@ -124,67 +213,366 @@ class Graph():
         Returns:
             A NetworkX Graph object
         '''
-        subgraph_ids = []
-        for node in self.graph.nodes(data=True):
-            data = node[1]['data']
-            conferences = data['conferences']
-            try:
-                _ = conferences[conference_id]
-                subgraph_ids.append(node[0])
-            except KeyError:
-                pass
-        subgraph = self.graph.subgraph(subgraph_ids)
+        subgraph_ids = self.conference_authors(conference_id)
+        subgraph = self.induced_subgraph(subgraph_ids)
         return subgraph
 
-    def get_subgraph_author(self, author_id: int, max_hop_dist: int):
+    @spanned("get_subgraph_confs")
+    def get_subgraph_confs(self, conference_ids: list, intersection: bool = False):
+        '''
+        Gets the sugraph induced by the set of authors who published at
+        any of conference_ids
+        Args:
+            conference_ids: A list with the integer ids of the conferences
+            intersection: If intersection equals true only the authors who
+                published at all of conference_ids are used
+        Returns:
+            A NetworkX Graph object
+        '''
+        author_sets = [set(self.conference_authors(conf_id)) for conf_id in conference_ids]
+        if not author_sets:
+            subgraph_ids = set()
+        elif intersection:
+            subgraph_ids = set.intersection(*author_sets)
+        else:
+            subgraph_ids = set.union(*author_sets)
+        subgraph = self.induced_subgraph(subgraph_ids)
+        return subgraph
+
+    def conference_authors(self, conference_id: int):
+        '''
+        Gets the authors who published at a conference
+        Args:
+            conference_id: The integer id of a conference
+        Returns:
+            A list with the author ids, empty if the conference does not exist
+        '''
+        return self.store.conference_authors(conference_id).tolist()
+
+    def publication_authors(self, publication_id: int):
+        '''
+        Gets the authors of a publication
+        Args:
+            publication_id: The integer id of a publication
+        Returns:
+            A list with the author ids, empty if the publication does not exist
+        '''
+        return self.store.publication_authors(publication_id).tolist()
+
+    @spanned("get_subgraph_author")
+    def get_subgraph_author(self, author_id: int, max_hop_dist: int, max_nodes: int = None):
         '''
         Gets the subgraph induced by nodes that have hop distance at most
-        equal to max_hop_dist with author_id
+        equal to max_hop_dist with author_id. The layers are found by the
+        breadth first search of the CSRGraph of the store
         Args:
             author_id: The integer id of an author
             max_hop_dist: the maximum hop distance to create the subgraph
+            max_nodes: The maximum number of nodes of the subgraph, the
+                search stops when it is reached
         Returns:
             A tuple with a NetworkX Graph object and the list of nodes
             on the graph
         '''
         if not self.__check_node(author_id):
             sys.exit(2)
-        author_ids = [author_id]
-        subgraph_ids = [author_id]
-        node_list = [[author_id]]
-        for _ in range(max_hop_dist):
-            edges = []
-            for aut_id in author_ids:
-                edges.extend(list(self.graph[aut_id].keys()))
-            author_ids = list(set(edges).difference(set(subgraph_ids)))
-            node_list.append(list(set(author_ids)))
-            subgraph_ids.extend(author_ids)
-        subgraph = self.graph.subgraph(subgraph_ids)
+        csr = self.store.csr
+        layers = csr.bfs_layers(csr.index_of(author_id), max_hop_dist, max_nodes)
+        expanded = np.concatenate(layers[:-1]) if max_hop_dist else layers[0][:0]
+        count(nodes=sum(len(layer) for layer in layers),
+              edges=int((csr.indptr[expanded + 1] - csr.indptr[expanded]).sum()))
+        node_list = [csr.to_ids(layer) for layer in layers]
+        subgraph_ids = [node for layer in node_list for node in layer]
+        subgraph = self.induced_subgraph(subgraph_ids)
         return subgraph, node_list
 
-    def aris_distance(self, author_id: int):
+    def induced_subgraph(self, author_ids):
+        '''
+        Gets the subgraph induced by a set of authors. Until the NetworkX
+        graph is created it is built from the rows of the authors on the
+        store, so it costs as much as the subgraph and not the whole graph
+        Args:
+            author_ids: An iterable with the integer ids of the authors, the
+                ones that are not on graph are left out
+        Returns:
+            A NetworkX Graph object
+        '''
+        if self._graph is not None:
+            return self._graph.subgraph(author_ids)
+        ids = self.store.csr.ids
+        author_ids = np.unique(np.fromiter(author_ids, dtype=np.int64))
+        positions = np.searchsorted(ids, author_ids)
+        found = positions < len(ids)
+        positions = positions[found]
+        return self.store.subgraph(positions[ids[positions] == author_ids[found]])
+
+    @spanned("nearest_authors")
+    def nearest_authors(self, author_id: int, radius: float = None, k: int = None):
+        '''
+        Gets the authors closest to author_id on the weighted graph, within
+        a shortest path weight of radius, the k closest ones, or the k closest
+        ones within radius. The search stops as soon as the bound is settled,
+        so it costs as much as the answer instead of the whole graph
+        Args:
+            author_id: The integer id of an author
+            radius: The maximum shortest path weight to author_id
+            k: The maximum number of authors
+        Returns:
+            A tuple where element 0 is a list of (author id, distance) tuples
+            sorted by distance, without author_id, and element 1 is the
+            subgraph induced by author_id and those authors
+        Raises:
+            ValueError if neither radius nor k is set
+        '''
+        if radius is None and k is None:
+            raise ValueError("Either radius or k must be set")
+        if not self.__check_node(author_id):
+            sys.exit(2)
+        csr = self.store.csr
+        nodes, dist = csr.bounded_dijkstra(csr.index_of(author_id), radius, k)
+        count(nodes=len(nodes), edges=int((csr.indptr[nodes + 1] - csr.indptr[nodes]).sum()))
+        authors = csr.to_ids(nodes)
+        nearest = list(zip(authors[1:], dist[1:].tolist()))
+        return nearest, self.induced_subgraph(authors)
+
+    @property
+    def components(self):
+        '''
+        The connected components of the graph, as a dict with a labels array
+        with the component of each dense index of store.csr and a sizes array
+        with the number of authors of each component. They are computed the
+        first time they are needed and saved with the graph
+        '''
+        if self.__components is None:
+            try:
+                self.__components = self.store.load_derived('components', ['labels', 'sizes'])
+            except FileNotFoundError:
+                with span("components"):
+                    _, labels = connected_components(self.store.csr.matrix(), directed=False)
+                    components = {'labels': labels, 'sizes': np.bincount(labels)}
+                    count(nodes=len(labels), components=len(components['sizes']))
+                if self.store.path is not None:
+                    self.store.save_derived('components', components)
+                self.__components = components
+        return self.__components
+
+    def component_of(self, author_id: int):
+        '''
+        Gets the label of the connected component of an author
+        Args:
+            author_id: The integer id of an author on graph
+        Returns:
+            The integer label of the component
+        '''
+        return int(self.components['labels'][self.store.csr.index_of(author_id)])
+
+    def component_size(self, author_id: int):
+        '''
+        Gets the number of authors on the connected component of an author
+        Args:
+            author_id: The integer id of an author on graph
+        Returns:
+            The size of the component, counting the author
+        '''
+        return int(self.components['sizes'][self.component_of(author_id)])
+
+    def connected(self, author_id: int, other_id: int):
+        '''
+        Checks if there is a path between two authors on graph
+        Returns:
+            True if both are on the same connected component, false otherwise
+        '''
+        return self.component_of(author_id) == self.component_of(other_id)
+
+    @property
+    def layout_cache(self):
+        '''
+        The LayoutCache of the plots of the graph. It is a folder of the store,
+        so the saved layouts are removed when the graph is created again
+        '''
+        return LayoutCache(os.path.join(self.store.path, 'layouts'))
+
+    def landmarks(self, number: int = LANDMARKS, strategy: str = 'degree'):
+        '''
+        Gets the landmark distance oracle of the graph. It is computed the
+        first time it is needed and saved with the graph
+        Args:
+            number: The number of landmarks
+            strategy: How the landmarks are picked, degree or farthest
+        Returns:
+            A LandmarkOracle object
+        '''
+        key = (number, strategy)
+        if key not in self.__landmarks:
+            name = "landmarks_{}_{}".format(strategy, str(number))
+            try:
+                oracle = LandmarkOracle(**self.store.load_derived(name, ['landmarks', 'distances']))
+            except FileNotFoundError:
+                say("Computing distances of {} landmarks".format(str(number)))
+                with span("landmarks", count=number, strategy=strategy):
+                    oracle = LandmarkOracle.build(self.store.csr, number, strategy)
+                    for row in oracle.distances.T:
+                        _count_settled(self.store.csr, row)
+                if self.store.path is not None:
+                    self.store.save_derived(name, oracle.to_arrays())
+            self.__landmarks[key] = oracle
+        return self.__landmarks[key]
+
+    def distance_bounds(self, author_id: int, other_id: int, number: int = LANDMARKS,
+                        strategy: str = 'degree'):
+        '''
+        Gets a lower and an upper bound of the shortest path weight between two
+        authors from the landmark oracle, without searching the graph
+        Args:
+            author_id: The integer id of an author
+            other_id: The integer id of the other author
+            number: The number of landmarks
+            strategy: How the landmarks are picked, degree or farthest
+        Returns:
+            A tuple with the lower and the upper bound, both inf if the
+            authors are not connected, or None if any of them is not on graph
+        '''
+        if not self.__check_node(author_id) or not self.__check_node(other_id):
+            return None
+        if not self.connected(author_id, other_id):
+            return float('inf'), float('inf')
+        csr = self.store.csr
+        return self.landmarks(number, strategy).bounds(csr.index_of(author_id),
+                                                      csr.index_of(other_id))
+
+    @spanned("hop_histograms")
+    def hop_histograms(self, author_ids: list, max_hop_dist: int):
+        '''
+        Counts the authors at each hop distance from many authors at once,
+        without creating their subgraphs
+        Args:
+            author_ids: A list with the integer ids of the authors
+            max_hop_dist: The maximum hop distance to count
+        Returns:
+            A dict with the author id as key and a list with the number of
+            authors at each hop distance (0 to max_hop_dist) as value.
+            Authors that are not on graph are left out
+        '''
+        author_ids = [author_id for author_id in author_ids if self.__check_node(author_id)]
+        csr = self.store.csr
+        histograms = csr.hop_histograms([csr.index_of(author_id) for author_id in author_ids],
+                                        max_hop_dist)
+        count(nodes=len(author_ids))
+        return dict(zip(author_ids, histograms.tolist()))
+
+    def aris_distance(self, author_id: int, cached: bool = False):
         '''
         Gets the shortest distance between author_id and Aris
         Args:
             author_id: The integer id of an author
+            cached: If cached equals true the path is read from the shortest
+                path tree of Aris, that is computed once and saved with the graph
         Returns:
             A path as a tuple where element 0 is the author id, 
             element 1 is the distance between the author and aris
             and element 2 is the authors name.
-            If author_id does not exist on graph it returns None
+            If author_id does not exist on graph or it is not on the
+            connected component of Aris it returns None
         '''
+        aris_node = self.__find_aris()
+        if aris_node is None:
+            return None
+        if self.has_author(author_id) and not self.connected(author_id, aris_node):
+            return None
+        if cached:
+            return self.tree_path(aris_node, author_id)
+        return self.author_distance(author_id, aris_node)
 
-        aris_node = None
-        # Find Aris
-        for node in self.graph.nodes():
-            author_name = self.graph.node[node]['data']['author']['name']
-            if author_name.lower() == 'aris anagnostopoulos':
-                aris_node = node
-                break
+    def aris_distances(self):
+        '''
+        Gets the shortest distance between every author and Aris, from the
+        shortest path tree of Aris
+        Returns:
+            A dict with the author id as key and the distance as value,
+            inf for the authors that are not connected to Aris
+        '''
+        aris_node = self.__find_aris()
         if aris_node is None:
-            print('Aris not found')
+            return {}
+        tree = self.shortest_path_tree(aris_node)
+        return dict(zip(self.store.csr.to_ids(slice(None)), tree['distances'].tolist()))
+
+    def __find_aris(self):
+        '''
+        Gets the id of Aris, or None if he is not on the graph
+        '''
+        aris_nodes = self.find_authors(ARIS)
+        if not aris_nodes:
+            say('Aris not found')
+            return None
+        return aris_nodes[0]
+
+    def shortest_path_tree(self, start: int):
+        '''
+        Gets the shortest path tree rooted at start. It is computed on the
+        first call and saved with the graph, next calls load it from disk
+        Args:
+            start: The root node of the tree
+        Returns:
+            A dict with a distances array and a predecessors array, both
+            indexed by the dense indices of store.csr. The predecessor of
+            start and of the unreachable nodes is negative
+        '''
+        name = "tree_{}".format(start)
+        try:
+            return self.store.load_derived(name, ['distances', 'predecessors'])
+        except FileNotFoundError:
+            pass
+        say("Computing shortest path tree of {}".format(str(start)))
+        with span("shortest_path_tree", start=start):
+            dist, pred = self.store.csr.dijkstra(self.store.csr.index_of(start))
+            _count_settled(self.store.csr, dist)
+        tree = {'distances': dist, 'predecessors': pred}
+        if self.store.path is not None:
+            self.store.save_derived(name, tree)
+        return tree
+
+    def tree_path(self, start: int, author_id: int):
+        '''
+        Gets the shortest path between start and author_id by walking the
+        predecessors on the shortest path tree of start
+        Args:
+            start: The root node of the tree
+            author_id: The integer id of an author
+        Returns:
+            The same path as author_distance(author_id, start)
+        '''
+        if not self.__check_node(author_id) or author_id == start:
+            return None
+        tree = self.shortest_path_tree(start)
+        csr = self.store.csr
+        node = csr.index_of(author_id)
+        if tree['predecessors'][node] < 0:
             return None
-        distances, prev = self.shortest_path(start=aris_node, finish=author_id, graph=self.graph)
+        path = []
+        while node >= 0:
+            control = csr.to_ids([node])[0]
+            path.append((control, float(tree['distances'][node]), self.get_author_name(control)))
+            node = int(tree['predecessors'][node])
+        path[-1] = (start, 0, path[-1][2])
+        return path[::-1]
+
+    def author_distance(self, author_id: int, target_id: int, landmarks: bool = False):
+        '''
+        Gets the shortest distance between author_id and target_id
+        Args:
+            author_id: The integer id of an author
+            target_id: The integer id of the author to measure the distance to
+            landmarks: If landmarks equals true the path is found with the
+                A* search of shortest_path instead of a bidirectional search
+        Returns:
+            A path as a list of tuples from target_id to author_id, where
+            element 0 is the author id, element 1 is the distance between the
+            author and target_id and element 2 is the authors name.
+            If there is no path it returns None
+        '''
+        distances, prev = self.shortest_path(start=target_id, finish=author_id,
+                                             bidirectional=not landmarks, landmarks=landmarks)
         if prev is not None:
             try:
                 prev[author_id]
@@ -192,117 +580,486 @@ class Graph():
                 return None
             path = [(author_id, distances[author_id], self.get_author_name(author_id))]
             control = prev[author_id]
-            while control != aris_node:
+            while control != target_id:
                 aut_name = self.get_author_name(control)
                 path.append((control, distances[control], aut_name))
                 control = prev[control]
-            path.append((aris_node, 0, 'Aris Anagnostopoulos'))
+            path.append((target_id, 0, self.get_author_name(target_id)))
             return path[::-1]
         else:
             return None
 
-    def shortest_path(self, start: int, graph: nx.Graph, finish=None):
+    @property
+    def name_index(self):
+        '''
+        The NameIndex of the authors on the graph. It is built the first
+        time it is needed and kept for the life of the Graph
+        '''
+        if self.__name_index is None:
+            ids = self.store.csr.ids.tolist()
+            self.__name_index = NameIndex(zip(ids, self.store.names))
+        return self.__name_index
+
+    def find_authors(self, name: str):
+        '''
+        Gets the ids of the authors with a given name, ignoring case
+        and extra whitespace
+        Args:
+            name: The name of the author
+        Returns:
+            A list with the ids of the authors, empty if there is none
+        '''
+        return self.name_index.lookup(name)
+
+    def complete_author_name(self, prefix: str, limit: int = 10):
+        '''
+        Gets the authors whose name starts with prefix
+        Args:
+            prefix: The start of the name
+            limit: The maximum number of names to return
+        Returns:
+            A list of (author id, author name) tuples in alphabetical order
+        '''
+        matches = self.name_index.prefix(prefix, limit)
+        return [(author_id, self.get_author_name(author_id))
+                for _, author_ids in matches for author_id in author_ids]
+
+    @spanned("shortest_path")
+    def shortest_path(self, start: int, graph: nx.Graph = None, finish=None,
+                      bidirectional: bool = False, landmarks: bool = False):
         '''
         Dijkstra algorithm for finding the shortest path.
         If finish is not set it finds the the shortest path between start and
         all the other nodes in graph.
         Args:
             start: The root node to find the shortest path from
-            graph: The graph object to look for the shortest path
+            graph: The graph object to look for the shortest path. If it is not
+                set the whole graph is used
             finish (int): The destination node to find the shortest path
+            bidirectional: If bidirectional equals true and finish is given,
+                the search runs from start and from finish at the same time
+            landmarks: If landmarks equals true and finish is given, the
+                search is an A* search on the compact graph, guided by the
+                lower bounds of the landmark oracle. It is only used on the
+                whole graph
         Returns:
             A tuple where element 0 dict is the shortest path between start
             and all the other nodes, and element 1 is a dict with the node as
             a key and the value is the previous node on the path to that node.
             If finish is given the iteration stops when finds finish but it still
-            returns the same tuple
+            returns the same tuple. On a bidirectional or landmarks search
+            both dicts only have the nodes on the path between start and finish
         '''
-
+        whole = graph is None or graph is self._graph
+        if landmarks and finish is not None and whole:
+            if not self.__check_node(start) or not self.__check_node(finish):
+                return {start: 0}, None
+            if not self.connected(start, finish):
+                return {start: 0}, {}
+            return self.__landmark_shortest_path(start, finish)
+        if bidirectional and finish is not None:
+            if not self.__check_node(start) or not self.__check_node(finish):
+                return {start: 0}, None
+            if whole and not self.connected(start, finish):
+                return {start: 0}, {}
+            return self.__bidirectional_shortest_path(start, finish, graph)
+        if self.csr is not None and whole:
+            if not self.__check_node(start) or \
+                    finish is not None and not self.__check_node(finish):
+                return dict.fromkeys(self.csr.to_ids(slice(None)), float('inf')), None
+            return self.__csr_shortest_path(start)
+        nodes, adjacency = self.__adjacency(graph)
         distances = {}
         prev = {}
-        for node in graph.nodes():
+        for node in nodes:
             distances[node] = float('inf')
         distances[start] = 0
         if not self.__check_node(start) or finish is not None and not self.__check_node(finish):
             return distances, None
+        if finish is not None and whole and not self.connected(start, finish):
+            return distances, {}
         p_queue = []
         hp.heappush(p_queue, (0, start))
         visited = set()
+        pushes, pops, edges = 1, 0, 0
         while p_queue:
             dist, node = hp.heappop(p_queue)
+            pops += 1
             if finish is not None:
                 if node == finish:
-                    return distances, prev
+                    break
             if node not in visited:
                 visited.add(node)
-                for edge in graph.edges(node, data=True):
-                    neighbour = edge[1]
-                    weigth = edge[2]['weight']
+                for neighbour, weigth in adjacency(node):
+                    edges += 1
                     _dist = dist + weigth
                     if _dist < distances[neighbour]:
                         distances[neighbour] = _dist
                         prev[neighbour] = node
                     if neighbour not in visited:
                         hp.heappush(p_queue, (_dist, neighbour))
+                        pushes += 1
+        count(nodes=len(visited), edges=edges, pushes=pushes, pops=pops)
         return distances, prev
 
+    def __landmark_shortest_path(self, start: int, finish: int):
+        '''
+        A* search between start and finish on the compact graph. Nodes are
+        taken from the queue by their distance to start plus the landmark
+        lower bound of their distance to finish, so the search is pulled
+        towards finish. A node is expanded again if a shorter path to it is
+        found, so the path is exact even though the bounds are rounded
+        Args:
+            start: The root node to find the shortest path from
+            finish: The destination node to find the shortest path
+        Returns:
+            The same tuple as shortest_path, only with the nodes on the path
+        '''
+        csr = self.store.csr
+        source, target = csr.index_of(start), csr.index_of(finish)
+        heuristic = self.landmarks().heuristic(target)
+        dists = {source: 0.0}
+        preds = {source: None}
+        p_queue = [(float(heuristic([source])[0]), 0.0, source)]
+        pushes, pops, edges, expanded = 1, 0, 0, 0
+        while p_queue:
+            _, dist, node = hp.heappop(p_queue)
+            pops += 1
+            if dist > dists[node]:
+                continue
+            if node == target:
+                break
+            expanded += 1
+            neighbours, weights = csr.neighbours(node)
+            bounds = heuristic(neighbours)
+            for neighbour, weight, bound in zip(neighbours.tolist(), weights.tolist(),
+                                                bounds.tolist()):
+                edges += 1
+                _dist = dist + weight
+                if _dist < dists.get(neighbour, float('inf')):
+                    dists[neighbour] = _dist
+                    preds[neighbour] = node
+                    hp.heappush(p_queue, (_dist + bound, _dist, neighbour))
+                    pushes += 1
+        count(nodes=expanded, edges=edges, pushes=pushes, pops=pops)
+        if target not in preds:
+            return {start: 0}, {}
+        path = [target]
+        while preds[path[-1]] is not None:
+            path.append(preds[path[-1]])
+        path.reverse()
+        path_dists = [dists[node] for node in path]
+        path = csr.to_ids(path)
+        distances = dict(zip(path, path_dists))
+        distances[path[0]] = 0
+        prev = dict(zip(path[1:], path[:-1]))
+        return distances, prev
+
+    def __bidirectional_shortest_path(self, start: int, finish: int, graph: nx.Graph = None):
+        '''
+        Bidirectional Dijkstra algorithm between start and finish. One search
+        grows from each end, always advancing the one with the closest node on
+        its queue, and it stops when the sum of the two queue tops is at least
+        the shortest path found through an edge between the two searches.
+        Distances are only kept for the nodes that were reached.
+        Args:
+            start: The root node to find the shortest path from
+            finish: The destination node to find the shortest path
+            graph: The graph object to look for the shortest path. If it is not
+                set the whole graph is used
+        Returns:
+            The same tuple as shortest_path, only with the nodes on the path
+        '''
+        if graph is None or graph is self._graph:
+            csr = self.store.csr
+            start, finish = csr.index_of(start), csr.index_of(finish)
+            to_ids = csr.to_ids
+            def adjacency(node):
+                nodes, weights = csr.neighbours(node)
+                return zip(nodes.tolist(), weights.tolist())
+        else:
+            to_ids = list
+            adjacency = self.__adjacency(graph)[1]
+        dists = ({start: 0}, {finish: 0})
+        preds = ({start: None}, {finish: None})
+        visited = (set(), set())
+        p_queues = ([(0, start)], [(0, finish)])
+        best = 0 if start == finish else float('inf')
+        meeting = (start, finish)
+        pushes, pops, edges = 2, 0, 0
+        while p_queues[0] and p_queues[1]:
+            if p_queues[0][0][0] + p_queues[1][0][0] >= best:
+                break
+            side = 0 if p_queues[0][0][0] <= p_queues[1][0][0] else 1
+            other = 1 - side
+            dist, node = hp.heappop(p_queues[side])
+            pops += 1
+            if node in visited[side]:
+                continue
+            visited[side].add(node)
+            for neighbour, weight in adjacency(node):
+                edges += 1
+                _dist = dist + weight
+                if _dist < dists[side].get(neighbour, float('inf')):
+                    dists[side][neighbour] = _dist
+                    preds[side][neighbour] = node
+                    hp.heappush(p_queues[side], (_dist, neighbour))
+                    pushes += 1
+                if neighbour in dists[other] and _dist + dists[other][neighbour] < best:
+                    best = _dist + dists[other][neighbour]
+                    meeting = (node, neighbour) if side == 0 else (neighbour, node)
+        count(nodes=len(visited[0]) + len(visited[1]), edges=edges, pushes=pushes, pops=pops)
+        if best == float('inf') or start == finish:
+            return {to_ids([start])[0]: 0}, {}
+        path = [meeting[0]]
+        while preds[0][path[-1]] is not None:
+            path.append(preds[0][path[-1]])
+        path.reverse()
+        forward = len(path)
+        path.append(meeting[1])
+        while preds[1][path[-1]] is not None:
+            path.append(preds[1][path[-1]])
+        path_dists = [dists[0][node] for node in path[:forward]] + \
+            [best - dists[1][node] for node in path[forward:]]
+        path = to_ids(path)
+        distances = dict(zip(path, path_dists))
+        distances[path[0]] = 0
+        prev = dict(zip(path[1:], path[:-1]))
+        return distances, prev
+
+    def __csr_shortest_path(self, start: int):
+        '''
+        Dijkstra algorithm on the compact graph. It always settles the
+        whole graph, since it runs outside the Python interpreter
+        Args:
+            start: The root node to find the shortest path from
+        Returns:
+            The same tuple as shortest_path
+        '''
+        dist, pred = self.csr.dijkstra(self.csr.index_of(start))
+        _count_settled(self.csr, dist)
+        distances = dict(zip(self.csr.to_ids(slice(None)), dist.tolist()))
+        reached = np.flatnonzero(pred >= 0)
+        prev = dict(zip(self.csr.to_ids(reached), self.csr.to_ids(pred[reached])))
+        return distances, prev
+
+    @spanned("multi_source_shortest_path")
+    def multi_source_shortest_path(self, sources: list, graph: nx.Graph = None):
+        '''
+        Dijkstra algorithm started from several roots at once. The heap is
+        seeded with every source at distance 0, so a single traversal gives
+        the distance from each node to its closest source.
+        Args:
+            sources: The list of root nodes, all of them must be on graph
+            graph: The graph object to look for the shortest path. If it is not
+                set the whole graph is used
+        Returns:
+            A tuple where element 0 is a dict with the distance between each
+            node and its closest source, element 1 is a dict with the
+            previous node on the path to that node and element 2 is a dict
+            with the closest source of each reachable node
+        '''
+        if self.csr is not None and (graph is None or graph is self._graph):
+            return self.__csr_multi_source_shortest_path(sources)
+        nodes, adjacency = self.__adjacency(graph)
+        distances = {}
+        prev = {}
+        nearest = {}
+        for node in nodes:
+            distances[node] = float('inf')
+        p_queue = []
+        for source in sources:
+            distances[source] = 0
+            nearest[source] = source
+            p_queue.append((0, source))
+        hp.heapify(p_queue)
+        visited = set()
+        pushes, pops, edges = len(p_queue), 0, 0
+        while p_queue:
+            dist, node = hp.heappop(p_queue)
+            pops += 1
+            if node in visited:
+                continue
+            visited.add(node)
+            for neighbour, weight in adjacency(node):
+                edges += 1
+                _dist = dist + weight
+                if _dist < distances[neighbour]:
+                    distances[neighbour] = _dist
+                    prev[neighbour] = node
+                    nearest[neighbour] = nearest[node]
+                    hp.heappush(p_queue, (_dist, neighbour))
+                    pushes += 1
+        count(nodes=len(visited), edges=edges, pushes=pushes, pops=pops)
+        return distances, prev, nearest
+
+    def __adjacency(self, graph: nx.Graph = None):
+        '''
+        Gets the nodes of graph and a function with the (neighbour, weight)
+        pairs of a node, for the searches that keep their own heap. The
+        whole graph is read from the CSR arrays of the store
+        Args:
+            graph: The graph object, the whole graph if it is not set
+        Returns:
+            A tuple with an iterable of the nodes and the function
+        '''
+        if graph is None or graph is self._graph:
+            csr = self.store.csr
+            ids = csr.ids
+            def adjacency(node):
+                nodes, weights = csr.neighbours(csr.index_of(node))
+                return zip(ids[nodes].tolist(), weights.tolist())
+            return ids.tolist(), adjacency
+        def adjacency(node):
+            return ((neighbour, edge['weight']) for neighbour, edge in graph[node].items())
+        return graph.nodes(), adjacency
+
+    def __csr_multi_source_shortest_path(self, sources: list):
+        '''
+        Multi source Dijkstra algorithm on the compact graph
+        Args:
+            sources: The list of root nodes
+        Returns:
+            The same tuple as multi_source_shortest_path
+        '''
+        ids = self.csr.to_ids(slice(None))
+        if not sources:
+            return dict.fromkeys(ids, float('inf')), {}, {}
+        dist, pred, origin = self.csr.multi_source_dijkstra(
+            [self.csr.index_of(source) for source in sources])
+        _count_settled(self.csr, dist)
+        distances = dict(zip(ids, dist.tolist()))
+        reached = np.flatnonzero(pred >= 0)
+        prev = dict(zip(self.csr.to_ids(reached), self.csr.to_ids(pred[reached])))
+        reached = np.flatnonzero(origin >= 0)
+        nearest = dict(zip(self.csr.to_ids(reached), self.csr.to_ids(origin[reached])))
+        return distances, prev, nearest
+
+    @spanned("set_group_number")
     def set_group_number(self, nodes_list: list):
         '''
         Sets the group numbers for the nodes on the graph.
         The group numbers can be accessed on the group_numbers attribute
         The group number is the min shortest path between the node and the nodes
-        on nodes_list.
+        on nodes_list. The node of nodes_list that gives the group number of
+        each reachable node can be accessed on the group_sources attribute.
         Args:
             nodes_list: an integer list with nodes id
         '''
-        self.group_numbers = {}
         nodes_list = [node for node in nodes_list if self.__check_node(node)]
-        nodes = self.graph.nodes()
-        dists = []
-        for sub_node in tqdm.tqdm(nodes_list, desc="Setting group numbers..."):
-            distances, _ = self.shortest_path(start=sub_node, graph=self.graph)
-            dists.append(distances)
-        for node in nodes:
-            self.group_numbers[node] = min([dist[node] for dist in dists]) \
-                if nodes_list else float('inf')
-        print("Finished\n")
+        say("Setting group numbers...")
+        self.group_numbers, _, self.group_sources = \
+            self.multi_source_shortest_path(nodes_list)
+        say("Finished\n")
+
+    @spanned("export_group_numbers")
+    def export_group_numbers(self, nodes_list: list, writer):
+        '''
+        Computes the group numbers of every author on the compact graph and
+        writes them with a results writer, as arrays, so no dict is created
+        for them and the group_numbers attribute is not changed
+        Args:
+            nodes_list: an integer list with nodes id
+            writer: A ResultsWriter from src.results
+        Returns:
+            The number of authors written
+        '''
+        csr = self.store.csr
+        sources = [csr.index_of(node) for node in nodes_list if self.__check_node(node)]
+        if sources:
+            dist = csr.multi_source_dijkstra(sources)[0]
+            _count_settled(csr, dist)
+        else:
+            dist = np.full(len(csr), np.inf)
+        writer.write_arrays(csr.ids, dist)
+        return len(dist)
 
-    def get_centralities(self, graph: nx.Graph):
+    @spanned("export_aris_distances")
+    def export_aris_distances(self, writer):
+        '''
+        Writes the shortest distance between every author and Aris with a
+        results writer, from the shortest path tree of Aris
+        Args:
+            writer: A ResultsWriter from src.results
+        Returns:
+            The number of authors written, 0 if Aris is not on the graph
+        '''
+        aris_node = self.__find_aris()
+        if aris_node is None:
+            return 0
+        tree = self.shortest_path_tree(aris_node)
+        writer.write_arrays(self.store.csr.ids, tree['distances'])
+        return len(tree['distances'])
+
+    def get_centralities(self, graph: nx.Graph, workers: int = WORKERS,
+                         approximate: bool = False, **sampling):
         '''
         Gets centralities measures from a NetworkX graph object.
+        Closeness and betweenness are computed in parallel by the centrality module.
         Args:
             graph: The graph to get the measures from
+            workers: The number of processes to use, all the cores if it is None
+            approximate: If approximate equals true closeness and betweenness are
+                estimated from a sample of pivot nodes
+            sampling: Arguments of approximate_centralities (samples, epsilon,
+                delta and seed)
         Returns:
             A tuple of dictionaries with degree, closeness and
-            betweenness centralities for each on graph
+            betweenness centralities for each on graph. If approximate is
+            true the tuple has a fourth dict with the error bounds
         '''
-        degree = nx.degree(graph)
-        closeness = nx.closeness_centrality(graph, distance='weight')
-        betweenness = nx.betweenness_centrality(graph,  weight='weight')
-        return degree, closeness, betweenness
+        with span("centralities", workers=workers, approximate=approximate) as measures:
+            measures.count(nodes=graph.number_of_nodes(), edges=graph.number_of_edges())
+            if approximate:
+                return approximate_centralities(graph, workers=workers, **sampling)
+            return centralities(graph, workers)
 
-    def __save_graph(self, reduced: bool = False):
+    def __save_graph(self, data_path: str, reduced: bool = False):
         '''
         Saves the graph object locally for later reuse
         Args:
+            data_path: The path to the dataset the graph was created from
             reduced: If the graph being save is the reduced one or not
+        Return:
+            The GraphStore object that was saved
         '''
         filename = RED_GRAPH if reduced else GRAPH
-        with open(filename, 'wb') as output:
-            pickle.dump(self.graph, output, pickle.HIGHEST_PROTOCOL)
+        with span("save", path=filename):
+            store = GraphStore.from_networkx(self.graph, fingerprint(data_path))
+            store.save(filename)
+        return store
 
-    def __load_graph(self, reduced: bool = False):
+    def __load_graph(self, data_path: str, reduced: bool = False):
         '''
-        Loads the graph object from local folder
+        Loads the graph store from local folder
         Args:
+            data_path: The path to the dataset the graph is created from
             reduced: If the graph being loaded is the reduced one or not
         Return:
-            The graph object
+            The GraphStore object
+        Raises:
+            FileNotFoundError if there is no store or if the dataset changed
+            after it was saved
         '''
         filename = RED_GRAPH if reduced else GRAPH
-        with open(filename, 'rb') as input_graph:
-            return pickle.load(input_graph)
-    
+        store = GraphStore.load(filename)
+        if store.is_stale(data_path):
+            say("\nDataset changed since the graph was saved")
+            raise FileNotFoundError(filename)
+        return store
+
+    def has_author(self, author_id: int):
+        '''
+        Check if an author exists on graph, without printing anything.
+        Args:
+            author_id: id of the author
+        Return:
+            True if the author exists on graph, false otherwise
+        '''
+        if self._graph is None:
+            return author_id in self.store.csr
+        return author_id in self.graph
+
     def __check_node(self, node: int):
         '''
         Check if node exists on graph.
@@ -312,10 +1069,13 @@ class Graph():
             True if node exists on graph, false otherwise
         '''
         try:
-            self.graph.node[node]
+            if self._graph is None:
+                self.store.csr.index_of(node)
+            else:
+                self.graph.nodes[node]
             return True
         except KeyError:
-            print("Author id {} does not exist on graph".format(str(node)))
+            say("Author id {} does not exist on graph".format(str(node)))
             return False
 
     def get_author_name(self, author_id: int):
@@ -326,4 +1086,14 @@ class Graph():
         Return:
             The name of the author as a string
         '''
-        return self.graph.node[author_id]['data']['author']['name'].title()
+        if self._graph is None:
+            return self.store.author_name(author_id).title()
+        return self.graph.nodes[author_id]['data']['author']['name'].title()
+
+def _count_settled(csr: CSRGraph, dist):
+    '''
+    Adds the nodes reached by a traversal on csr and the edges it scanned
+    to the running span
+    '''
+    reached = np.flatnonzero(np.isfinite(dist))
+    count(nodes=len(reached), edges=int((csr.indptr[reached + 1] - csr.indptr[reached]).sum()))
@@ -0,0 +1,93 @@
+'''
+Module to read the DBLP publication records incrementally.
+The dataset is a JSON array of publications, plain or gzip compressed,
+and the records are decoded one at a time from a bounded buffer, so the
+whole document is never held in memory
+'''
+import os
+import gzip
+import json
+
+GZIP_MAGIC = b'\x1f\x8b'
+BOM = '\ufeff'
+CHUNK_SIZE = 1 << 20
+
+def resolve_data_path(data_path: str):
+    '''
+    Gets the path of the dataset to read. If data_path does not exist
+    but a gzip compressed copy of it does, the compressed one is used
+    Args:
+        data_path: The path to the json file with the graph data
+    Returns:
+        The path to be read
+    '''
+    if not os.path.exists(data_path) and os.path.exists(data_path + '.gz'):
+        return data_path + '.gz'
+    return data_path
+
+def open_dataset(data_path: str):
+    '''
+    Opens a dataset as text, decompressing it if it is gzip compressed
+    Args:
+        data_path: The path to the json file, compressed or not
+    Returns:
+        A text file object
+    '''
+    with open(data_path, 'rb') as data_file:
+        magic = data_file.read(2)
+    if magic == GZIP_MAGIC:
+        return gzip.open(data_path, 'rt', encoding='utf-8')
+    return open(data_path, encoding='utf-8')
+
+def iter_publications(data_path: str, chunk_size: int = CHUNK_SIZE):
+    '''
+    Iterates over the publication records of a dataset without loading it
+    as a whole. The records are the elements of the top level JSON array
+    Args:
+        data_path: The path to the json file, compressed or not
+        chunk_size: The number of characters read from the file at a time
+    Returns:
+        A generator of publication dicts
+    '''
+    decoder = json.JSONDecoder()
+    with open_dataset(resolve_data_path(data_path)) as data_file:
+        buffer = data_file.read(chunk_size)
+        position = _skip(buffer, 0, BOM)
+        # The whitespace before the array can be longer than a chunk
+        while position == len(buffer):
+            buffer = data_file.read(chunk_size)
+            if not buffer:
+                break
+            position = _skip(buffer, 0, BOM)
+        if not buffer.startswith('[', position):
+            raise ValueError("{} is not a JSON array".format(data_path))
+        position += 1
+        eof = False
+        while True:
+            position = _skip(buffer, position, ',')
+            if buffer.startswith(']', position):
+                return
+            try:
+                entry, end = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The record is cut at the end of the buffer, read the rest
+                if eof:
+                    raise
+                buffer = buffer[position:]
+                position = 0
+                chunk = data_file.read(chunk_size)
+                eof = not chunk
+                buffer += chunk
+                continue
+            position = end
+            yield entry
+
+def _skip(buffer: str, position: int, separators: str = ''):
+    '''
+    Gets the position of the next character on buffer that is not
+    whitespace or one of separators
+    '''
+    while position < len(buffer) and (buffer[position].isspace() or
+                                      buffer[position] in separators):
+        position += 1
+    return position
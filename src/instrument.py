@@ -0,0 +1,201 @@
+'''
+Module to instrument the phases of the graph.
+Each phase runs inside a named span that records its wall time, the peak
+resident memory of the process when it ends and counts added by the code
+inside it (nodes and edges visited, heap pushes and pops). Finished spans
+are passed to the hooks added with add_hook, and a Recorder hook keeps them
+to be saved as JSON. The prints and progress bars of the graph go through
+say and progress, so they can be turned off with set_quiet
+'''
+import json
+import time
+import threading
+from functools import wraps
+from contextlib import contextmanager
+import tqdm
+try:
+    import resource
+except ImportError:
+    resource = None
+
+_HOOKS = []
+_QUIET = False
+_LOCAL = threading.local()
+
+class Span():
+
+    '''
+    Class with the measures of a phase
+    Args:
+        name: The name of the phase
+        parent: The span the phase runs inside of, if any
+        attributes: Values that describe the phase, like its arguments
+    '''
+
+    def __init__(self, name: str, parent=None, **attributes):
+        self.name = name
+        self.parent = parent
+        self.depth = 0 if parent is None else parent.depth + 1
+        self.attributes = attributes
+        self.counts = {}
+        self.start = time.time()
+        self.seconds = None
+        self.peak_rss_kb = None
+
+    def count(self, **counts):
+        '''
+        Adds to the counts of the span
+        '''
+        for key, value in counts.items():
+            self.counts[key] = self.counts.get(key, 0) + value
+
+    def set(self, **attributes):
+        '''
+        Sets attributes of the span
+        '''
+        self.attributes.update(attributes)
+
+    def to_dict(self):
+        '''
+        Gets the span as a dict that can be saved as JSON
+        '''
+        return {
+            "name": self.name,
+            "parent": None if self.parent is None else self.parent.name,
+            "depth": self.depth,
+            "start": self.start,
+            "seconds": self.seconds,
+            "peak_rss_kb": self.peak_rss_kb,
+            "attributes": self.attributes,
+            "counts": self.counts
+        }
+
+class Recorder():
+
+    '''
+    Hook that keeps every finished span
+    '''
+
+    def __init__(self):
+        self.spans = []
+        self.__lock = threading.Lock()
+
+    def __call__(self, span: Span):
+        with self.__lock:
+            self.spans.append(span.to_dict())
+
+    def dump(self, path: str):
+        '''
+        Saves the spans as a JSON list, in the order they finished
+        Args:
+            path: The path of the JSON file
+        '''
+        with open(path, 'w') as jfile:
+            json.dump(self.spans, jfile, indent=2)
+
+def add_hook(hook):
+    '''
+    Adds a function that is called with each span when it finishes
+    '''
+    _HOOKS.append(hook)
+
+def remove_hook(hook):
+    '''
+    Removes a function added with add_hook
+    '''
+    _HOOKS.remove(hook)
+
+@contextmanager
+def recording(path: str = None):
+    '''
+    Records the spans that finish inside the context
+    Args:
+        path: A path to save the spans as JSON when the context ends
+    Returns:
+        The Recorder with the spans
+    '''
+    recorder = Recorder()
+    add_hook(recorder)
+    try:
+        yield recorder
+    finally:
+        remove_hook(recorder)
+        if path is not None:
+            recorder.dump(path)
+
+@contextmanager
+def span(name: str, **attributes):
+    '''
+    Runs the code inside the context as a phase
+    Args:
+        name: The name of the phase
+        attributes: Values that describe the phase
+    Returns:
+        The Span, to add counts to it
+    '''
+    stack = _stack()
+    current = Span(name, stack[-1] if stack else None, **attributes)
+    stack.append(current)
+    start = time.perf_counter()
+    try:
+        yield current
+    except BaseException as error:
+        current.set(error=type(error).__name__)
+        raise
+    finally:
+        current.seconds = time.perf_counter() - start
+        stack.pop()
+        if resource is not None:
+            current.peak_rss_kb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        for hook in list(_HOOKS):
+            hook(current)
+
+def spanned(name: str):
+    '''
+    Decorator that runs each call of a function as a phase
+    Args:
+        name: The name of the phase
+    '''
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def count(**counts):
+    '''
+    Adds to the counts of the innermost running span, if there is one
+    '''
+    stack = _stack()
+    if stack:
+        stack[-1].count(**counts)
+
+def set_quiet(quiet: bool = True):
+    '''
+    Turns the prints and progress bars of say and progress off or on
+    '''
+    global _QUIET
+    _QUIET = quiet
+
+def say(*args, **kwargs):
+    '''
+    Prints unless quiet is set
+    '''
+    if not _QUIET:
+        print(*args, **kwargs)
+
+def progress(iterable, **kwargs):
+    '''
+    Wraps iterable in a tqdm progress bar, that is hidden if quiet is set
+    '''
+    return tqdm.tqdm(iterable, disable=_QUIET, **kwargs)
+
+def _stack():
+    '''
+    Gets the running spans of the current thread
+    '''
+    if not hasattr(_LOCAL, 'spans'):
+        _LOCAL.spans = []
+    return _LOCAL.spans
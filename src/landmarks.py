@@ -0,0 +1,140 @@
+'''
+Module with a landmark distance oracle. The shortest path weights between a
+few landmark authors and every author are computed once, and by the
+triangle inequality, for any landmark l,
+    |d(l, u) - d(l, v)| <= d(u, v) <= d(l, u) + d(l, v)
+so the distance between any two authors is bounded by reading one row of
+each, in O(landmarks). The lower bound is also an admissible heuristic for
+an A* search between two authors
+'''
+import numpy as np
+from scipy.sparse.csgraph import dijkstra
+from src.conf import LANDMARKS
+from src.csr import CSRGraph
+
+STRATEGIES = ('degree', 'farthest')
+# The distances are kept as float32, the bounds are widened by this relative
+# error so they still hold after the rounding
+ROUNDING = 1e-6
+
+class LandmarkOracle():
+
+    '''
+    Class with the distances between every node and each landmark
+    Args:
+        landmarks: Array with the dense indices of the landmarks
+        distances: Array of shape (nodes, landmarks) with the shortest path
+            weight between each node and each landmark, inf if they are not
+            connected. A row per node, so the bounds of two nodes read two
+            contiguous rows
+    '''
+
+    def __init__(self, landmarks, distances):
+        self.landmarks = landmarks
+        self.distances = distances
+
+    @classmethod
+    def build(cls, csr: CSRGraph, count: int = LANDMARKS, strategy: str = 'degree'):
+        '''
+        Picks the landmarks and computes their distances to every node
+        Args:
+            csr: The CSRGraph of the graph
+            count: The number of landmarks
+            strategy: degree to pick the authors with most co-authors, or
+                farthest to pick, after the author with most co-authors, the
+                author furthest from the landmarks picked so far on its
+                connected component
+        Returns:
+            A LandmarkOracle object
+        Raises:
+            ValueError if the strategy is unknown
+        '''
+        if strategy not in STRATEGIES:
+            raise ValueError("Unknown landmark strategy {}, use one of {}".format(
+                strategy, ', '.join(STRATEGIES)))
+        count = min(count, len(csr))
+        degree = np.diff(csr.indptr)
+        if not count:
+            landmarks = np.zeros(0, dtype=np.int64)
+            distances = np.zeros((0, len(csr)))
+        elif strategy == 'degree':
+            landmarks = np.argsort(-degree, kind='stable')[:count]
+            distances = dijkstra(csr.matrix(), directed=True, indices=landmarks)
+        else:
+            landmarks = [int(np.argmax(degree))]
+            rows = [dijkstra(csr.matrix(), directed=True, indices=landmarks[0])]
+            closest = rows[0].copy()
+            while len(landmarks) < count:
+                candidates = np.where(np.isfinite(closest), closest, -1)
+                candidates[landmarks] = -1
+                landmark = int(np.argmax(candidates))
+                if candidates[landmark] < 0:
+                    break
+                landmarks.append(landmark)
+                rows.append(dijkstra(csr.matrix(), directed=True, indices=landmark))
+                np.minimum(closest, rows[-1], out=closest)
+            landmarks = np.array(landmarks, dtype=np.int64)
+            distances = np.vstack(rows)
+        distances = np.ascontiguousarray(np.reshape(distances, (len(landmarks), len(csr))).T,
+                                         dtype=np.float32)
+        return cls(np.asarray(landmarks, dtype=np.int64), distances)
+
+    def to_arrays(self):
+        '''
+        Gets the arrays of the oracle, to be saved with GraphStore.save_derived
+        '''
+        return {'landmarks': self.landmarks, 'distances': self.distances}
+
+    def bounds(self, node: int, other: int):
+        '''
+        Gets a lower and an upper bound of the shortest path weight between
+        two nodes
+        Args:
+            node: The dense index of a node
+            other: The dense index of the other node
+        Returns:
+            A tuple with the lower and the upper bound. Both are inf if a
+            landmark shows the nodes are not connected, and the bounds are
+            0 and inf if no landmark is connected to them
+        '''
+        if node == other:
+            return 0.0, 0.0
+        first = np.asarray(self.distances[node], dtype=np.float64)
+        second = np.asarray(self.distances[other], dtype=np.float64)
+        first_finite = np.isfinite(first)
+        finite = first_finite & np.isfinite(second)
+        if (first_finite != np.isfinite(second)).any():
+            return float('inf'), float('inf')
+        if not finite.any():
+            return 0.0, float('inf')
+        first, second = first[finite], second[finite]
+        total = first + second
+        lower = (np.abs(first - second) - ROUNDING * total).max()
+        upper = (total * (1 + ROUNDING)).min()
+        return max(float(lower), 0.0), float(upper)
+
+    def heuristic(self, target: int):
+        '''
+        Gets the lower bound of the distance to target as a function of an
+        array of nodes, to be used as the heuristic of an A* search
+        Args:
+            target: The dense index of the target node
+        Returns:
+            A function that gets an array of dense indices and returns an
+            array with a lower bound of the distance between each one and target
+        '''
+        row = np.asarray(self.distances[target], dtype=np.float64)
+        finite = np.isfinite(row)
+        if not finite.any():
+            return lambda nodes: np.zeros(len(nodes))
+        # Only the landmarks connected to target, every node the search
+        # reaches is on its component, so its distances to them are finite
+        distances = np.asarray(self.distances)
+        columns = None if finite.all() else np.flatnonzero(finite)
+        row = row[finite]
+        slack = ROUNDING * row
+        def lower_bounds(nodes):
+            rows = distances[nodes] if columns is None else distances[nodes][:, columns]
+            bounds = (np.abs(rows - row) - ROUNDING * rows - slack).max(axis=1)
+            return np.maximum(bounds, 0)
+        return lower_bounds
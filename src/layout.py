@@ -0,0 +1,303 @@
+'''
+Module to compute the positions of the nodes of a graph for the plots.
+The layout is a force directed one, as the Fruchterman-Reingold layout of
+NetworkX, but for large graphs the repulsion between the nodes is
+approximated with a hierarchy of grids, as Barnes-Hut does with a quadtree:
+each node is pushed by the nodes of its own and neighbouring cells, and by
+the centre of mass of the cells further away, so an iteration is close to
+linear on the number of nodes instead of quadratic.
+A layout can start from previously computed positions, and the layouts are
+saved on a LayoutCache keyed by their set of nodes, so plotting the same
+subgraph again does not compute it again
+'''
+import os
+import hashlib
+import tempfile
+import numpy as np
+from src.instrument import span, count
+
+ITERATIONS = 50
+EXACT_NODES = 1000
+LEAF_SIZE = 8
+TEMPERATURE = 0.1
+WARM_TEMPERATURE = 0.02
+
+class LayoutCache():
+
+    '''
+    Class to save layouts on a folder, one file for each set of nodes
+    Args:
+        path: The path of the folder, it is created on the first layout saved
+    '''
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def get(self, nodes):
+        '''
+        Gets the saved layout of a set of nodes
+        Args:
+            nodes: An iterable with the integer ids of the nodes
+        Returns:
+            A dict with the position of each node, or None if the layout of
+            the nodes was not saved
+        '''
+        try:
+            with np.load(self.__file(nodes)) as saved:
+                ids = saved['nodes']
+                positions = saved['positions']
+        except (FileNotFoundError, OSError, KeyError, ValueError):
+            return None
+        return dict(zip(ids.tolist(), positions))
+
+    def put(self, positions: dict):
+        '''
+        Saves a layout, replacing the saved layout of the same nodes
+        Args:
+            positions: A dict with the position of each node
+        '''
+        os.makedirs(self.path, exist_ok=True)
+        path = self.__file(positions)
+        ids = np.fromiter(positions, dtype=np.int64, count=len(positions))
+        # Each writer has its own temporary file, render workers can save
+        # the layout of the same nodes at once
+        handle, tmp_path = tempfile.mkstemp(dir=self.path, suffix='.tmp.npz')
+        try:
+            with os.fdopen(handle, 'wb') as tmp:
+                np.savez(tmp, nodes=ids,
+                         positions=np.array([positions[node] for node in ids.tolist()],
+                                            dtype=np.float64).reshape(-1, 2))
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.remove(tmp_path)
+            raise
+
+    def __file(self, nodes):
+        '''
+        Gets the path of the file of a set of nodes
+        '''
+        return os.path.join(self.path, node_key(nodes) + '.npz')
+
+def node_key(nodes):
+    '''
+    Gets a key that only depends on the set of nodes
+    Args:
+        nodes: An iterable with the integer ids of the nodes
+    Returns:
+        The hex digest of the sorted ids
+    '''
+    ids = np.unique(np.fromiter(nodes, dtype=np.int64))
+    return hashlib.sha1(ids.tobytes()).hexdigest()
+
+def layout(graph, cache: LayoutCache = None, warm: dict = None, **options):
+    '''
+    Gets the positions of the nodes of a graph, from the cache if they were
+    saved on it, otherwise computed with force_layout and saved
+    Args:
+        graph: The NetworkX graph
+        cache: A LayoutCache, if it is not set the layout is always computed
+        warm: Positions of some of the nodes to start the layout from, like
+            the layout of a smaller subgraph with the same root
+        options: Other arguments of force_layout
+    Returns:
+        A dict with the position of each node, between -1 and 1
+    '''
+    if cache is not None:
+        positions = cache.get(graph.nodes())
+        if positions is not None:
+            count(layout_cache_hits=1)
+            return positions
+    positions = force_layout(graph, pos=warm, **options)
+    if cache is not None and positions:
+        cache.put(positions)
+    return positions
+
+def force_layout(graph, pos: dict = None, iterations: int = ITERATIONS, seed: int = 0,
+                 weight: str = None, exact_nodes: int = EXACT_NODES,
+                 leaf_size: int = LEAF_SIZE):
+    '''
+    Force directed layout, with the forces of Fruchterman-Reingold.
+    Graphs with more than exact_nodes nodes have their repulsion
+    approximated with grids
+    Args:
+        graph: The NetworkX graph
+        pos: Positions to start from, the nodes without position are placed
+            next to their placed neighbours. When it is set the layout starts
+            colder, so it refines the positions instead of moving them around
+        iterations: The number of iterations
+        seed: The seed of the random initial positions
+        weight: The edge attribute with the strength of the attraction, every
+            edge has the same strength if it is not set
+        exact_nodes: The maximum number of nodes to compute the repulsion
+            between every two nodes
+        leaf_size: The mean number of nodes of the cells of the finest grid
+    Returns:
+        A dict with the position of each node, between -1 and 1
+    '''
+    nodes = list(graph.nodes())
+    if len(nodes) < 2:
+        return {node: np.zeros(2) for node in nodes}
+    index = {node: position for position, node in enumerate(nodes)}
+    sources, targets, strengths = [], [], []
+    for first, second, data in graph.edges(data=True):
+        if first != second:
+            sources.append(index[first])
+            targets.append(index[second])
+            strengths.append(1.0 if weight is None else data.get(weight, 1.0))
+    edges = (np.array(sources, dtype=np.int64), np.array(targets, dtype=np.int64),
+             np.array(strengths, dtype=np.float64))
+    rng = np.random.RandomState(seed)
+    with span("layout", nodes=len(nodes), edges=len(sources),
+              warm=pos is not None) as current:
+        points = _initial_positions(graph, nodes, index, pos, rng)
+        k = 1 / np.sqrt(len(nodes))
+        temperature = TEMPERATURE if pos is None else WARM_TEMPERATURE
+        cooling = temperature / (iterations + 1)
+        exact = len(nodes) <= exact_nodes
+        for _ in range(iterations):
+            if exact:
+                displacement = _exact_repulsion(points, k)
+            else:
+                displacement = _grid_repulsion(points, k, leaf_size)
+            displacement -= _attraction(points, edges, k)
+            length = np.sqrt((displacement ** 2).sum(axis=1))
+            length[length < 1e-9] = 1e-9
+            points += displacement * (np.minimum(length, temperature) / length)[:, None]
+            temperature -= cooling
+        current.count(iterations=iterations)
+    return dict(zip(nodes, _rescale(points)))
+
+def _initial_positions(graph, nodes: list, index: dict, pos: dict, rng):
+    '''
+    Gets the positions to start the layout from, on the unit square
+    '''
+    points = rng.random_sample((len(nodes), 2))
+    if not pos:
+        return points
+    placed = np.zeros(len(nodes), dtype=bool)
+    for node, position in pos.items():
+        if node in index:
+            # Saved layouts are between -1 and 1
+            points[index[node]] = (np.asarray(position, dtype=np.float64) + 1) / 2
+            placed[index[node]] = True
+    if not placed.any():
+        return points
+    jitter = 0.1 / np.sqrt(len(nodes))
+    frontier = [node for node in nodes if placed[index[node]]]
+    # Breadth first from the placed nodes, each new node goes next to the
+    # mean of its placed neighbours
+    while frontier:
+        following = []
+        for node in frontier:
+            for neighbour in graph.neighbors(node):
+                position = index[neighbour]
+                if placed[position]:
+                    continue
+                around = [index[other] for other in graph.neighbors(neighbour)
+                          if placed[index[other]]]
+                points[position] = points[around].mean(axis=0) + jitter * rng.randn(2)
+                placed[position] = True
+                following.append(neighbour)
+        frontier = following
+    return points
+
+def _attraction(points, edges: tuple, k: float):
+    '''
+    Gets the attraction of the edges on each node, d^2 / k along each edge
+    '''
+    sources, targets, strengths = edges
+    delta = points[sources] - points[targets]
+    distance = np.sqrt((delta ** 2).sum(axis=1))
+    force = delta * (strengths * distance / k)[:, None]
+    size = len(points)
+    return np.column_stack([
+        np.bincount(sources, weights=force[:, axis], minlength=size)
+        - np.bincount(targets, weights=force[:, axis], minlength=size)
+        for axis in range(2)])
+
+def _exact_repulsion(points, k: float):
+    '''
+    Gets the repulsion between every two nodes, k^2 / d away from each other
+    '''
+    delta = points[:, None, :] - points[None, :, :]
+    distance2 = (delta ** 2).sum(axis=2)
+    np.maximum(distance2, 1e-9, out=distance2)
+    return (delta * (k * k / distance2)[:, :, None]).sum(axis=1)
+
+def _grid_repulsion(points, k: float, leaf_size: int):
+    '''
+    Gets the repulsion of the nodes approximated with grids of 2^l x 2^l
+    cells over the bounding square of the nodes. On each level a node is
+    pushed by the centre of mass of the cells that are not its neighbours
+    but are children of the neighbours of its cell on the level above, and
+    on the finest level by every node of its own and neighbouring cells.
+    Every other node is counted exactly once
+    '''
+    size = len(points)
+    levels = max(2, int(np.ceil(np.log(size / leaf_size) / np.log(4))))
+    low = points.min(axis=0)
+    extent = (points.max(axis=0) - low).max() or 1.0
+    unit = (points - low) / extent
+    x, y = points[:, 0], points[:, 1]
+    displacement = np.zeros_like(points)
+    # The 6 x 6 children of the 3 x 3 neighbours of the parent cell
+    offsets = np.arange(6)
+    for level in range(2, levels + 1):
+        side = 2 ** level
+        cell_x = np.minimum((unit[:, 0] * side).astype(np.int64), side - 1)
+        cell_y = np.minimum((unit[:, 1] * side).astype(np.int64), side - 1)
+        cell_ids = cell_x * side + cell_y
+        mass = np.bincount(cell_ids, minlength=side * side).astype(np.float64)
+        centre_x = np.bincount(cell_ids, weights=x, minlength=side * side) / np.maximum(mass, 1)
+        centre_y = np.bincount(cell_ids, weights=y, minlength=side * side) / np.maximum(mass, 1)
+        other_x = (2 * (cell_x // 2) - 2)[:, None, None] + offsets[None, :, None]
+        other_y = (2 * (cell_y // 2) - 2)[:, None, None] + offsets[None, None, :]
+        valid = (other_x >= 0) & (other_x < side) & (other_y >= 0) & (other_y < side) & \
+            ((np.abs(other_x - cell_x[:, None, None]) > 1) |
+             (np.abs(other_y - cell_y[:, None, None]) > 1))
+        other_ids = np.where(valid, other_x * side + other_y, 0).reshape(size, -1)
+        delta_x = x[:, None] - centre_x[other_ids]
+        delta_y = y[:, None] - centre_y[other_ids]
+        force = valid.reshape(size, -1) * mass[other_ids] * k * k / \
+            np.maximum(delta_x * delta_x + delta_y * delta_y, 1e-9)
+        displacement[:, 0] += (delta_x * force).sum(axis=1)
+        displacement[:, 1] += (delta_y * force).sum(axis=1)
+    displacement += _near_repulsion(points, cell_x, cell_y, side, k)
+    return displacement
+
+def _near_repulsion(points, cell_x, cell_y, side: int, k: float):
+    '''
+    Gets the repulsion between the nodes of neighbouring cells of a grid
+    '''
+    size = len(points)
+    cell_ids = cell_x * side + cell_y
+    order = np.argsort(cell_ids, kind='stable')
+    members = np.bincount(cell_ids, minlength=side * side)
+    starts = np.concatenate(([0], np.cumsum(members)))[:-1]
+    first, second = [], []
+    nodes = np.arange(size)
+    for offset_x in (-1, 0, 1):
+        for offset_y in (-1, 0, 1):
+            other_x = cell_x + offset_x
+            other_y = cell_y + offset_y
+            valid = (other_x >= 0) & (other_x < side) & (other_y >= 0) & (other_y < side)
+            other_ids = other_x[valid] * side + other_y[valid]
+            repeats = members[other_ids]
+            within = np.arange(repeats.sum()) - np.repeat(np.cumsum(repeats) - repeats, repeats)
+            first.append(np.repeat(nodes[valid], repeats))
+            second.append(order[np.repeat(starts[other_ids], repeats) + within])
+    first = np.concatenate(first)
+    second = np.concatenate(second)
+    delta_x = points[first, 0] - points[second, 0]
+    delta_y = points[first, 1] - points[second, 1]
+    force = k * k / np.maximum(delta_x * delta_x + delta_y * delta_y, 1e-9)
+    return np.column_stack([np.bincount(first, weights=delta_x * force, minlength=size),
+                            np.bincount(first, weights=delta_y * force, minlength=size)])
+
+def _rescale(points):
+    '''
+    Centres the positions on the origin and scales them to fit between -1 and 1
+    '''
+    points = points - points.mean(axis=0)
+    limit = np.abs(points).max()
+    return points / limit if limit > 0 else points
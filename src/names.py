@@ -0,0 +1,64 @@
+'''
+Module with an index from author names to author ids.
+Names are normalized to lower case with single spaces, so lookups do not
+depend on how a name was typed
+'''
+from bisect import bisect_left
+
+def normalize_name(name: str):
+    '''
+    Normalizes an author name for lookups
+    Args:
+        name: The name of an author
+    Returns:
+        The name casefolded and with runs of whitespace as a single space
+    '''
+    return ' '.join(name.split()).casefold()
+
+class NameIndex():
+
+    '''
+    Class to find authors by name. Several authors can share a name, so
+    every lookup returns a list of author ids
+    Args:
+        names: An iterable of (author id, name) tuples
+    '''
+
+    def __init__(self, names):
+        self.authors = {}
+        for author_id, name in names:
+            self.authors.setdefault(normalize_name(name), []).append(author_id)
+        self.keys = sorted(self.authors)
+
+    def __len__(self):
+        return len(self.authors)
+
+    def lookup(self, name: str):
+        '''
+        Gets the authors with a given name
+        Args:
+            name: The name of the author
+        Returns:
+            A list with the ids of the authors with that name, empty if
+            there is none
+        '''
+        return list(self.authors.get(normalize_name(name), []))
+
+    def prefix(self, prefix: str, limit: int = 10):
+        '''
+        Gets the authors whose name starts with prefix, in alphabetical order
+        Args:
+            prefix: The start of the name
+            limit: The maximum number of names to return
+        Returns:
+            A list of (normalized name, list of author ids) tuples
+        '''
+        prefix = normalize_name(prefix)
+        position = bisect_left(self.keys, prefix)
+        matches = []
+        while position < len(self.keys) and len(matches) < limit and \
+                self.keys[position].startswith(prefix):
+            key = self.keys[position]
+            matches.append((key, list(self.authors[key])))
+            position += 1
+        return matches
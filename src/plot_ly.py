@@ -1,12 +1,16 @@
 '''
 Module with functions to plot a plotly graph
 '''
-from plotly.graph_objs import Scatter, Marker, Data, Figure, Layout, Font, YAxis, Margin
-import networkx as nx
+import numpy as np
+from plotly.graph_objs import Scatter, Scattergl, Marker, Data, Figure, Layout, Font, YAxis, \
+    Margin
+from src.layout import layout as node_layout
+
+WEBGL_ELEMENTS = 5000
 
 def scatter_nodes(pos, labels=None, size=8, opacity=1,
                   title="Centrality", data=None, nodes=None,
-                  colorscale='Hot'):
+                  colorscale='Hot', webgl=False):
     '''
     Function to create a trace of scatter points to represent a node
     on the plot.
@@ -24,20 +28,23 @@ def scatter_nodes(pos, labels=None, size=8, opacity=1,
         'Greys' | 'Greens' | 'Bluered' | 'Hot' | 'Picnic' | 'Portland' |
         Jet' | 'RdBu' | 'Blackbody' | 'Earth' | 'Electric' | 'YIOrRd' |
         'YIGnBu'
+        webgl (bool): if True the trace is drawn with WebGL (Scattergl)
     Return:
         A trace object to be used on a plotly plot
     '''
-    trace = Scatter(
-        x=[],
-        y=[],
+    coordinates = _coordinates(pos, nodes)
+    trace = (Scattergl if webgl else Scatter)(
+        x=coordinates[:, 0],
+        y=coordinates[:, 1],
         mode='markers',
         marker=Marker(
             showscale=True,
 
             colorscale=colorscale,
             reversescale=True,
-            color=[],
-            size=10,
+            color=np.fromiter((data[node] for node in nodes), dtype=np.float64,
+                              count=len(nodes)),
+            size=size,
             colorbar=dict(
                 thickness=15,
                 title=title,
@@ -45,19 +52,17 @@ def scatter_nodes(pos, labels=None, size=8, opacity=1,
                 titleside='right'
             ),
             line=dict(width=2)
-        )
+        ),
+        name='',
+        text=labels,
+        hoverinfo='text',
+        opacity=opacity
     )
-    for node in nodes:
-        trace['x'].append(pos[node][0])
-        trace['y'].append(pos[node][1])
-        trace['marker']['color'].append(data[node])
-    attrib = dict(name='', text=labels, hoverinfo='text', opacity=opacity)
-    trace = dict(trace, **attrib)
-    trace['marker']['size'] = size
     return trace
 
 
-def scatter_edges(graph, pos, line_color='#a3a3c2', line_width=1):
+def scatter_edges(graph, pos, line_color='#a3a3c2', line_width=1, edges=None,
+                  webgl=False):
     '''
     Function to create a trace to represent an edge on the plot.
     Args:
@@ -65,25 +70,73 @@ def scatter_edges(graph, pos, line_color='#a3a3c2', line_width=1):
         pos (dict): node positions on the graph
         line_color (hex str): the color of the edge
         line_width (int): the width of the edge
+        edges (list): the edges to be plotted, all the edges of the graph
+            if it is not set
+        webgl (bool): if True the trace is drawn with WebGL (Scattergl)
     Return:
         A trace object to be used on a plotly plot
     '''
-    trace = Scatter(
-        x=[],
-        y=[],
+    edges = list(graph.edges()) if edges is None else edges
+    ends = _coordinates(pos, [node for edge in edges for node in edge[:2]])
+    # Each edge is a segment followed by a gap, as in x0, x1, None
+    x = np.full(3 * len(edges), np.nan)
+    y = np.full(3 * len(edges), np.nan)
+    x[0::3], x[1::3] = ends[0::2, 0], ends[1::2, 0]
+    y[0::3], y[1::3] = ends[0::2, 1], ends[1::2, 1]
+    line = dict(width=line_width)
+    if line_color is not None:
+        line['color'] = line_color
+    trace = (Scattergl if webgl else Scatter)(
+        x=x,
+        y=y,
         mode='lines',
+        hoverinfo='none',
+        line=line
     )
-    for edge in graph.edges():
-        trace['x'] += [pos[edge[0]][0], pos[edge[1]][0], None]
-        trace['y'] += [pos[edge[0]][1], pos[edge[1]][1], None]
-        trace['hoverinfo'] = 'none'
-        trace['line']['width'] = line_width
-        if line_color is not None:
-            trace['line']['color'] = line_color
     return trace
 
 
-def plot_ly(subgraph, title, data, measure, colorscale='Hot'):
+def decimate_edges(graph, per_node, weight='weight'):
+    '''
+    Function to pick the strongest edges of each node, to plot large graphs.
+    The weights are distances, so the strongest edges are the ones with the
+    lowest weight. An edge is kept if it is among the per_node strongest
+    edges of either of its nodes, so every node with edges keeps at least one
+    Args:
+        graph (NetworkX Graph): the graph to be plotted
+        per_node (int): the number of edges kept for each node
+        weight (str): the edge attribute with the weight
+    Return:
+        A list with the kept edges
+    '''
+    edges = list(graph.edges(data=weight, default=1.0))
+    if not edges:
+        return []
+    index = {node: position for position, node in enumerate(graph.nodes())}
+    first = np.fromiter((index[edge[0]] for edge in edges), dtype=np.int64, count=len(edges))
+    second = np.fromiter((index[edge[1]] for edge in edges), dtype=np.int64, count=len(edges))
+    weights = np.fromiter((edge[2] for edge in edges), dtype=np.float64, count=len(edges))
+    # Both directions of each edge, sorted by node and then by weight
+    nodes = np.concatenate((first, second))
+    order = np.lexsort((np.tile(weights, 2), nodes))
+    starts = np.searchsorted(nodes[order], nodes[order])
+    rank = np.empty(len(order), dtype=np.int64)
+    rank[order] = np.arange(len(order)) - starts
+    kept = (rank[:len(edges)] < per_node) | (rank[len(edges):] < per_node)
+    return [edges[position][:2] for position in np.flatnonzero(kept)]
+
+
+def _coordinates(pos, nodes):
+    '''
+    Function to get the positions of a list of nodes as a (len(nodes), 2) array
+    '''
+    if not len(nodes):
+        return np.empty((0, 2))
+    return np.array([pos[node] for node in nodes], dtype=np.float64)
+
+
+def plot_ly(subgraph, title, data, measure, colorscale='Hot', pos=None, cache=None,
+            webgl=None, edges_per_node=None):
     '''
     Function to get a plotly figure object to be plotted
     Args:
@@ -96,19 +149,33 @@ def plot_ly(subgraph, title, data, measure, colorscale='Hot'):
         'Greys' | 'Greens' | 'Bluered' | 'Hot' | 'Picnic' | 'Portland' |
         Jet' | 'RdBu' | 'Blackbody' | 'Earth' | 'Electric' | 'YIOrRd' |
         'YIGnBu'
+        pos (dict): node positions, computed with src.layout if not given
+        cache (LayoutCache): cache of the layouts, like graph.layout_cache,
+            used when pos is not given
+        webgl (bool): if True the traces are drawn with WebGL, by default
+            only when the graph has more than WEBGL_ELEMENTS nodes and edges
+        edges_per_node (int): if set only the strongest edges of each node
+            are plotted (see decimate_edges)
     '''
-    pos = nx.spring_layout(subgraph, k=.12)
-    nodes = list(subgraph.node.keys())
+    if pos is None:
+        pos = node_layout(subgraph, cache=cache)
+    nodes = list(subgraph.nodes.keys())
     nodes.sort()
-    labels = []
-    for node in subgraph.nodes():
-        author_name = subgraph.node[node]['data']['author']['name'].title()
-        label = "{}<br>{} = {}".format(author_name, measure, str(data[node]))
-        labels.append(label)
-    trace1 = scatter_edges(subgraph, pos)
+    labels = [
+        "{}<br>{} = {}".format(subgraph.nodes[node]['data']['author']['name'].title(),
+                               measure, str(data[node]))
+        for node in nodes
+    ]
+    edges = None
+    if edges_per_node is not None:
+        edges = decimate_edges(subgraph, edges_per_node)
+    if webgl is None:
+        elements = len(nodes) + (subgraph.number_of_edges() if edges is None else len(edges))
+        webgl = elements > WEBGL_ELEMENTS
+    trace1 = scatter_edges(subgraph, pos, edges=edges, webgl=webgl)
     trace2 = scatter_nodes(pos=pos, labels=labels,
                            title=title, data=data,
-                           nodes=nodes, colorscale=colorscale)
+                           nodes=nodes, colorscale=colorscale, webgl=webgl)
     width = 800
     height = 600
     axis = dict(
@@ -0,0 +1,194 @@
+'''
+Module with the compact node data of the graph.
+Publications and conferences are kept a single time, on the tables of a
+Catalog shared by the whole graph, and the data of each node only has the
+name and id of the author and the integer ids of its publications and
+conferences. The node data can still be read as the nested dicts of the
+dataset, node['data']['author']['name'] or
+node['data']['publications'][id]['title']
+'''
+from array import array
+from collections.abc import Mapping
+
+class Record():
+
+    '''
+    Base class of the records of the catalog tables, with slots instead of
+    a dict. The fields can be read as attributes or as keys
+    '''
+
+    __slots__ = ()
+
+    def __getitem__(self, key: str):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key)
+
+    def __eq__(self, other):
+        return type(self) is type(other) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return "{}({})".format(type(self).__name__, self.to_dict())
+
+    def to_dict(self):
+        '''
+        Gets the record as a dict, as it is on the dataset
+        '''
+        return {key: getattr(self, key) for key in self.__slots__}
+
+class Publication(Record):
+
+    '''
+    Record of a publication
+    '''
+
+    __slots__ = ('id_str', 'id_int', 'title')
+
+    def __init__(self, id_str: str, id_int: int, title: str):
+        self.id_str = id_str
+        self.id_int = id_int
+        self.title = title
+
+class Conference(Record):
+
+    '''
+    Record of a conference
+    '''
+
+    __slots__ = ('id_str', 'id_int')
+
+    def __init__(self, id_str: str, id_int: int):
+        self.id_str = id_str
+        self.id_int = id_int
+
+class Catalog():
+
+    '''
+    Class with the tables of publications and conferences of a graph,
+    indexed by their integer ids
+    Args:
+        publications: The table of publications, a new dict if it is not set
+        conferences: The table of conferences, a new dict if it is not set
+    '''
+
+    def __init__(self, publications=None, conferences=None):
+        self.publications = {} if publications is None else publications
+        self.conferences = {} if conferences is None else conferences
+
+    def add_publication(self, id_str: str, id_int: int, title: str):
+        '''
+        Adds a publication to the table, if it is not there yet
+        Returns:
+            The integer id of the publication
+        '''
+        if id_int not in self.publications:
+            self.publications[id_int] = Publication(id_str, id_int, title)
+        return id_int
+
+    def add_conference(self, id_str: str, id_int: int):
+        '''
+        Adds a conference to the table, if it is not there yet
+        Returns:
+            The integer id of the conference
+        '''
+        if id_int not in self.conferences:
+            self.conferences[id_int] = Conference(id_str, id_int)
+        return id_int
+
+class References(Mapping):
+
+    '''
+    Read only dict view of the publications or conferences of a node, from
+    their ids to their records. The ids are checked with a set, built on
+    the first lookup and again if ids grew since then
+    Args:
+        ids: The ids of the records
+        table: The catalog table with the records
+    '''
+
+    __slots__ = ('ids', 'table', '__members', '__length')
+
+    def __init__(self, ids, table: dict):
+        self.ids = ids
+        self.table = table
+        self.__members = None
+        self.__length = 0
+
+    def __contains__(self, key):
+        if self.__members is None or self.__length != len(self.ids):
+            self.__members = frozenset(self.ids)
+            self.__length = len(self.ids)
+        return key in self.__members
+
+    def __getitem__(self, key: int):
+        if key not in self:
+            raise KeyError(key)
+        return self.table[key]
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+    def values(self):
+        '''
+        Gets the records, in the order of ids
+        '''
+        return [self.table[key] for key in self.ids]
+
+    def items(self):
+        '''
+        Gets the (id, record) tuples, in the order of ids
+        '''
+        return [(key, self.table[key]) for key in self.ids]
+
+class NodeData():
+
+    '''
+    Data of an author node. The ids of the publications and conferences are
+    kept on arrays of integers, without repetitions, in the order they were
+    added
+    Args:
+        author_id: The integer id of the author
+        name: The name of the author
+        catalog: The Catalog of the graph
+        publication_ids: An iterable with the ids of the author publications
+        conference_ids: An iterable with the ids of the author conferences
+    '''
+
+    __slots__ = ('id', 'name', 'catalog', 'publication_ids', 'conference_ids')
+
+    def __init__(self, author_id: int, name: str, catalog: Catalog,
+                 publication_ids=(), conference_ids=()):
+        self.id = author_id
+        self.name = name
+        self.catalog = catalog
+        self.publication_ids = array('q', publication_ids)
+        self.conference_ids = array('q', conference_ids)
+
+    def __getitem__(self, key: str):
+        if key == 'author':
+            return {"name": self.name, "id": self.id}
+        if key == 'publications':
+            return References(self.publication_ids, self.catalog.publications)
+        if key == 'conferences':
+            return References(self.conference_ids, self.catalog.conferences)
+        raise KeyError(key)
+
+    def add(self, publication_id: int, conference_id: int):
+        '''
+        Adds a publication and its conference to the author. Repeated
+        publications are only removed by compact
+        '''
+        self.publication_ids.append(publication_id)
+        if conference_id not in self.conference_ids:
+            self.conference_ids.append(conference_id)
+
+    def compact(self):
+        '''
+        Removes the repeated publications, keeping the first of each
+        '''
+        if len(set(self.publication_ids)) != len(self.publication_ids):
+            self.publication_ids = array('q', dict.fromkeys(self.publication_ids))
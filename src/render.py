@@ -0,0 +1,283 @@
+'''
+Module to draw the plots of the homework and to render them to files
+without a display. A render job is a dict with the name of the plot on
+'plot' and its arguments:
+    {"plot": "subgraph", "author_id": 1, "max_hop_dist": 2}
+    {"plot": "distance", "author_id": 1}
+    {"plot": "conference", "conference_id": 1}
+The jobs run on a pool of processes, each one with the saved graph loaded
+once, and a job is skipped when its file is newer than the saved graph.
+The arrays saved with the graph that the jobs read are built before the
+pool starts, so the workers only load them
+'''
+import os
+import sys
+from multiprocessing import Pool
+import numpy as np
+import networkx as nx
+import matplotlib.cm as cm
+import matplotlib.patches as mpatches
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from src.conf import WORKERS, ARIS
+from src.graph import Graph
+from src.instrument import span, progress, set_quiet
+from src.layout import layout
+from src.store import META
+
+FIGURE_SIZE = (16, 12)
+FORMATS = ('png', 'svg')
+
+_GRAPH = None
+
+def subgraph_author_layout(subgraph, node_list: list, cache=None):
+    '''
+    Gets the layout of a hop subgraph, starting from the saved layout of the
+    subgraph one hop smaller when there is one
+    Args:
+        subgraph: The NetworkX hop subgraph
+        node_list: The list of the authors at each hop distance
+        cache: A LayoutCache
+    Returns:
+        A dict with the position of each node
+    '''
+    warm = None
+    if cache is not None and len(node_list) > 2:
+        warm = cache.get(node for nodes in node_list[:-1] for node in nodes)
+    return layout(subgraph, cache=cache, warm=warm)
+
+def draw_subgraph_author(axes, subgraph, node_list: list, pos: dict):
+    '''
+    Draws a hop subgraph with a color for each hop distance
+    Args:
+        axes: The matplotlib axes to draw on
+        subgraph: The NetworkX hop subgraph
+        node_list: The list of the authors at each hop distance
+        pos: The position of each node
+    '''
+    legend_handles = []
+    colors = _colors(len(node_list) + 1)
+    for index, value in enumerate(node_list):
+        color = colors[index]
+        if index == 0:
+            label = "Root"
+        else:
+            label = 'Distance {}'.format(str(index))
+        patch = mpatches.Patch(color=color, label=label)
+        legend_handles.append(patch)
+        nx.draw_networkx(subgraph, pos=pos, nodelist=value, node_color=[color],
+                         with_labels=False, node_size=100, ax=axes)
+    axes.legend(handles=legend_handles)
+
+def draw_aris_path(axes, path: list, author_name: str):
+    '''
+    Draws the shortest path between Aris and an author, with the weight of
+    each edge
+    Args:
+        axes: The matplotlib axes to draw on
+        path: The path as returned by Graph.aris_distance
+        author_name: The name of the author
+    '''
+    aris_graph = nx.Graph()
+    aris_graph.add_node(path[0][0])
+    edge_labels = {}
+    for current, next_n in zip(path, path[1:]):
+        aris_graph.add_edge(current[0], next_n[0], weight=next_n[1])
+        edge_labels[(current[0], next_n[0])] = round(abs(current[1] - next_n[1]), 2)
+    pos = layout(aris_graph)
+    colors = _colors(len(path) + 1)
+    nx.draw_networkx_edge_labels(aris_graph, pos, edge_labels=edge_labels, ax=axes)
+    for index, value in enumerate(path):
+        nx.draw_networkx(aris_graph, pos=pos, nodelist=[value[0]], node_color=[colors[index]],
+                         labels={value[0]: value[2]}, with_labels=True, node_size=1500,
+                         ax=axes)
+    axes.set_title('Shortest path between Aris and {} = {}'\
+        .format(author_name, str(round(path[-1][1], 4))))
+
+def draw_conference(axes, subgraph, conference_id: int, pos: dict):
+    '''
+    Draws the subgraph of the authors of a conference, colored by their
+    degree centrality on it
+    Args:
+        axes: The matplotlib axes to draw on
+        subgraph: The NetworkX subgraph of the conference
+        conference_id: The integer id of the conference
+        pos: The position of each node
+    '''
+    nodes = list(subgraph.nodes())
+    degree = nx.degree_centrality(subgraph) if len(nodes) > 1 else {node: 0 for node in nodes}
+    nx.draw_networkx(subgraph, pos=pos, nodelist=nodes,
+                     node_color=[degree[node] for node in nodes], cmap=cm.YlOrRd,
+                     with_labels=False, node_size=60, edge_color='#a3a3c2', ax=axes)
+    axes.set_title('Authors of conference {} by degree centrality'.format(str(conference_id)))
+
+def output_name(job: dict, fmt: str = 'png'):
+    '''
+    Gets the file name of the plot of a job, that only depends on its arguments
+    Raises:
+        KeyError if the job misses an argument
+        ValueError if the plot or the format is unknown
+    '''
+    if fmt not in FORMATS:
+        raise ValueError("Unknown format {}".format(fmt))
+    plot = job.get('plot')
+    if plot == 'subgraph':
+        name = "subgraph_{}_{}".format(int(job['author_id']), int(job['max_hop_dist']))
+    elif plot == 'distance':
+        name = "distance_{}".format(int(job['author_id']))
+    elif plot == 'conference':
+        name = "conference_{}".format(int(job['conference_id']))
+    else:
+        raise ValueError("Unknown plot {}".format(plot))
+    return name + '.' + fmt
+
+def render(jobs: list, output_dir: str, reduced: bool = False, fmt: str = 'png',
+           workers: int = WORKERS, force: bool = False):
+    '''
+    Renders the plots of a list of jobs to files on output_dir. The plots
+    whose file is newer than the saved graph are not drawn again, and the
+    error of each failed job is printed on the standard error
+    Args:
+        jobs: A list of job dicts
+        output_dir: The folder of the files, it is created if it does not exist
+        reduced: If reduced equals true it will use the reduced data
+            to create the graph, otherwise it will use the full data
+        fmt: The format of the files, png or svg
+        workers: The number of processes, all the cores if it is not set.
+            With one worker everything runs on the current process
+        force: If force equals true every plot is drawn again
+    Returns:
+        A dict with the number of rendered, skipped (up to date or repeated)
+        and failed jobs and the error of each failed job
+    '''
+    global _GRAPH
+    graph = Graph(reduced)
+    graph_time = os.path.getmtime(os.path.join(graph.store.path, META))
+    os.makedirs(output_dir, exist_ok=True)
+    summary = {"rendered": 0, "skipped": 0, "failed": 0, "errors": {}}
+    pending = []
+    paths = set()
+    for position, job in enumerate(jobs):
+        try:
+            path = os.path.join(output_dir, output_name(job, fmt))
+        except (KeyError, ValueError, TypeError, AttributeError) as error:
+            summary["failed"] += 1
+            summary["errors"][position] = "Invalid job: {}".format(str(error))
+            continue
+        if path in paths or \
+                not force and os.path.exists(path) and os.path.getmtime(path) >= graph_time:
+            summary["skipped"] += 1
+            continue
+        paths.add(path)
+        pending.append((position, job, path, fmt))
+    if pending:
+        _prepare(graph, [job for _, job, _, _ in pending])
+    workers = min(workers or os.cpu_count() or 1, max(len(pending), 1))
+    with span("render", jobs=len(pending), workers=workers) as current:
+        if workers == 1:
+            _GRAPH = graph
+            results = map(_render_job, pending)
+            results = list(progress(results, total=len(pending), desc="Rendering..."))
+        else:
+            with Pool(workers, initializer=_init_worker, initargs=(reduced,)) as pool:
+                results = list(progress(pool.imap_unordered(_render_job, pending),
+                                        total=len(pending), desc="Rendering..."))
+        for position, error in results:
+            if error is None:
+                summary["rendered"] += 1
+            else:
+                summary["failed"] += 1
+                summary["errors"][position] = error
+        current.count(rendered=summary["rendered"], failed=summary["failed"])
+    # The errors are printed even when quiet is set, as the summary only
+    # counts them
+    for position, error in sorted(summary["errors"].items()):
+        print("Job {} failed: {}".format(str(position), error), file=sys.stderr)
+    return summary
+
+def _prepare(graph: Graph, jobs: list):
+    '''
+    Builds the connected components and, if any job plots a distance, the
+    shortest path tree of Aris, so they are saved with the graph once
+    instead of by every worker at the same time
+    '''
+    _ = graph.components
+    if any(job.get('plot') == 'distance' for job in jobs):
+        aris_nodes = graph.find_authors(ARIS)
+        if aris_nodes:
+            graph.shortest_path_tree(aris_nodes[0])
+
+def _init_worker(reduced: bool):
+    '''
+    Loads the saved graph on the worker process
+    '''
+    global _GRAPH
+    set_quiet()
+    _GRAPH = Graph(reduced)
+
+def _render_job(pending: tuple):
+    '''
+    Draws the plot of a job and saves it. The file is written under a
+    temporary name and renamed at the end, so an interrupted job never
+    leaves a file that looks up to date, and the temporary file is removed
+    when saving fails
+    Args:
+        pending: A tuple with the position of the job, the job, the path of
+            the file and its format
+    Returns:
+        A tuple with the position of the job and None, or the error if the
+        job failed
+    '''
+    position, job, path, fmt = pending
+    figure = Figure(figsize=FIGURE_SIZE)
+    FigureCanvasAgg(figure)
+    axes = figure.add_subplot(1, 1, 1)
+    tmp_path = path + '.tmp'
+    try:
+        _draw_job(axes, job)
+        try:
+            figure.savefig(tmp_path, format=fmt)
+            os.replace(tmp_path, path)
+        except BaseException:
+            # savefig may fail before or after it creates the file
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+    except KeyError as error:
+        return position, "Missing or unknown {}".format(str(error))
+    except (ValueError, TypeError, OSError) as error:
+        return position, str(error)
+    return position, None
+
+def _draw_job(axes, job: dict):
+    '''
+    Draws the plot of a job on axes, with the graph of the process
+    '''
+    graph = _GRAPH
+    plot = job['plot']
+    if plot in ('subgraph', 'distance') and not graph.has_author(int(job['author_id'])):
+        raise ValueError("Author id {} does not exist on graph".format(str(job['author_id'])))
+    if plot == 'subgraph':
+        subgraph, node_list = graph.get_subgraph_author(int(job['author_id']),
+                                                        int(job['max_hop_dist']))
+        pos = subgraph_author_layout(subgraph, node_list, graph.layout_cache)
+        draw_subgraph_author(axes, subgraph, node_list, pos)
+    elif plot == 'distance':
+        author_id = int(job['author_id'])
+        path = graph.aris_distance(author_id, cached=True)
+        if path is None:
+            raise ValueError("There is no path between Aris and {}"\
+                .format(graph.get_author_name(author_id)))
+        draw_aris_path(axes, path, graph.get_author_name(author_id))
+    else:
+        subgraph = graph.get_subgraph_conf(int(job['conference_id']))
+        if not len(subgraph):
+            raise ValueError("Conference {} has no authors".format(str(job['conference_id'])))
+        draw_conference(axes, subgraph, int(job['conference_id']),
+                        layout(subgraph, cache=graph.layout_cache))
+
+def _colors(number: int):
+    '''
+    Gets number colors evenly spaced on the hsv colormap
+    '''
+    return [tuple(color) for color in cm.hsv(np.linspace(0, 1, number))]
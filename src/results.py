@@ -0,0 +1,265 @@
+'''
+Module with writers of per author results, like group numbers or the
+distances to Aris. The results are written as they come, a chunk at a time,
+so a whole graph traversal is never turned into a single string. The
+formats are
+    .npy: two arrays, <name>_ids.npy with the author ids and <name>_<column>.npy
+        with the values, inf for the unreachable authors
+    .csv: an author_id,<column> header and a line for each author, with an
+        empty value for the unreachable authors
+    .json: an object from author id to value, null for the unreachable authors
+    .jsonl: an object {"author_id": id, <column>: value} on each line, with
+        null for the unreachable authors
+'''
+import os
+import json
+import math
+import shutil
+import numpy as np
+
+CHUNK_SIZE = 65536
+
+class ResultsWriter():
+
+    '''
+    Base class of the writers. A writer is used as a context manager, the
+    output is written under a temporary name and it replaces the path when
+    the writer is closed. If the block raises an exception the temporary
+    output is removed, so a failed run never leaves a file that looks
+    complete and keeps the output of the last complete run
+    Args:
+        path: The path of the output
+        column: The name of the values, like distance or group_number
+    '''
+
+    def __init__(self, path: str, column: str = 'distance'):
+        self.path = path
+        self.column = column
+        self.written = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *_):
+        if exc_type is None:
+            self.close()
+        else:
+            self.discard()
+
+    def write(self, author_id: int, value: float):
+        '''
+        Writes the result of an author
+        Args:
+            author_id: The integer id of the author
+            value: The result, inf or None if the author is unreachable
+        '''
+        self.write_arrays(np.array([author_id], dtype=np.int64),
+                          np.array([_float(value)], dtype=np.float64))
+
+    def write_dict(self, results: dict):
+        '''
+        Writes the results of a dict from author id to value
+        '''
+        ids = np.fromiter(results, dtype=np.int64, count=len(results))
+        values = np.fromiter((_float(value) for value in results.values()),
+                             dtype=np.float64, count=len(results))
+        self.write_arrays(ids, values)
+
+    def write_arrays(self, ids, values):
+        '''
+        Writes the results of arrays of author ids and values, a chunk at a time
+        Args:
+            ids: An array with the integer ids of the authors
+            values: An array with the value of each author, inf if the author
+                is unreachable
+        '''
+        for start in range(0, len(ids), CHUNK_SIZE):
+            self._write_chunk(np.asarray(ids[start:start + CHUNK_SIZE], dtype=np.int64),
+                              np.asarray(values[start:start + CHUNK_SIZE], dtype=np.float64))
+            self.written += min(CHUNK_SIZE, len(ids) - start)
+
+    @property
+    def outputs(self):
+        '''
+        The list of the files written
+        '''
+        return [self.path]
+
+    def _write_chunk(self, ids, values):
+        '''
+        Writes a chunk of results, implemented by each format
+        '''
+        raise NotImplementedError
+
+    def close(self):
+        '''
+        Finishes the output
+        '''
+        raise NotImplementedError
+
+    def discard(self):
+        '''
+        Closes the writer without finishing the output and removes its
+        temporary files
+        '''
+        raise NotImplementedError
+
+class NpyWriter(ResultsWriter):
+
+    '''
+    Writer of the ids and the values as two .npy arrays. The data is written
+    to temporary files and the arrays are created when the writer is closed,
+    since their header has their length
+    '''
+
+    def __init__(self, path: str, column: str = 'distance'):
+        super().__init__(path, column)
+        stem = path[:-len('.npy')] if path.endswith('.npy') else path
+        self.paths = {'ids': stem + '_ids.npy', 'values': stem + '_' + column + '.npy'}
+        self.__files = {name: open(name_path + '.tmp', 'wb')
+                        for name, name_path in self.paths.items()}
+
+    @property
+    def outputs(self):
+        return [self.paths['ids'], self.paths['values']]
+
+    def _write_chunk(self, ids, values):
+        self.__files['ids'].write(ids.astype('<i8').tobytes())
+        self.__files['values'].write(values.astype('<f8').tobytes())
+
+    def close(self):
+        for name, dtype in (('ids', '<i8'), ('values', '<f8')):
+            self.__files[name].close()
+            tmp_path = self.paths[name] + '.tmp'
+            with open(self.paths[name] + '.part', 'wb') as output, open(tmp_path, 'rb') as data:
+                np.lib.format.write_array_header_1_0(output, {
+                    'descr': dtype, 'fortran_order': False, 'shape': (self.written,)})
+                shutil.copyfileobj(data, output)
+            os.remove(tmp_path)
+            os.replace(self.paths[name] + '.part', self.paths[name])
+
+    def discard(self):
+        for name, path in self.paths.items():
+            self.__files[name].close()
+            _remove(path + '.tmp')
+
+class TextWriter(ResultsWriter):
+
+    '''
+    Base class of the writers of a text file. The file is written to
+    <path>.part and renamed to path when the writer is closed
+    '''
+
+    def __init__(self, path: str, column: str = 'distance'):
+        super().__init__(path, column)
+        self.file = open(path + '.part', 'w')
+
+    def close(self):
+        self.file.close()
+        os.replace(self.path + '.part', self.path)
+
+    def discard(self):
+        self.file.close()
+        _remove(self.path + '.part')
+
+class CsvWriter(TextWriter):
+
+    '''
+    Writer of a CSV file with an author_id column and a column with the values
+    '''
+
+    def __init__(self, path: str, column: str = 'distance'):
+        super().__init__(path, column)
+        self.file.write("author_id,{}\n".format(column))
+
+    def _write_chunk(self, ids, values):
+        self.file.write(''.join(
+            "{},{}\n".format(author_id, _text(value))
+            for author_id, value in zip(ids.tolist(), values.tolist())))
+
+class JsonWriter(TextWriter):
+
+    '''
+    Writer of a JSON object from author id to value
+    '''
+
+    def __init__(self, path: str, column: str = 'distance'):
+        super().__init__(path, column)
+        self.file.write('{')
+
+    def _write_chunk(self, ids, values):
+        self.file.write(''.join(
+            '{}"{}": {}'.format(', ' if self.written or position else '', author_id,
+                                _text(value, 'null'))
+            for position, (author_id, value) in enumerate(zip(ids.tolist(), values.tolist()))))
+
+    def close(self):
+        self.file.write('}\n')
+        super().close()
+
+class JsonLinesWriter(TextWriter):
+
+    '''
+    Writer of a JSON object with the author id and the value on each line
+    '''
+
+    def __init__(self, path: str, column: str = 'distance'):
+        super().__init__(path, column)
+        self.__line = '{{"author_id": {}, ' + json.dumps(column) + ': {}}}\n'
+
+    def _write_chunk(self, ids, values):
+        self.file.write(''.join(
+            self.__line.format(author_id, _text(value, 'null'))
+            for author_id, value in zip(ids.tolist(), values.tolist())))
+
+WRITERS = {
+    '.npy': NpyWriter,
+    '.csv': CsvWriter,
+    '.json': JsonWriter,
+    '.jsonl': JsonLinesWriter
+}
+
+def open_writer(path: str, column: str = 'distance'):
+    '''
+    Opens the writer of the format given by the extension of path
+    Args:
+        path: The path of the output, ending with .npy, .csv, .json or .jsonl
+        column: The name of the values
+    Returns:
+        A ResultsWriter
+    Raises:
+        ValueError if the extension is not one of the formats
+    '''
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in WRITERS:
+        raise ValueError("Unknown results format {}, use one of {}".format(
+            extension, ', '.join(sorted(WRITERS))))
+    return WRITERS[extension](path, column)
+
+def finite(value: float):
+    '''
+    Replaces inf, that is not valid JSON, by None
+    '''
+    return None if math.isinf(value) else value
+
+def _float(value):
+    '''
+    Gets a result as a float, inf for None
+    '''
+    return math.inf if value is None else float(value)
+
+def _text(value: float, missing: str = ''):
+    '''
+    Formats a value so it is read back as the same float, or missing if it
+    is not finite
+    '''
+    return repr(value) if math.isfinite(value) else missing
+
+def _remove(path: str):
+    '''
+    Removes a file if it exists
+    '''
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -0,0 +1,271 @@
+'''
+Module with a query server that keeps the graph loaded in memory.
+The server answers JSON requests sent with POST over HTTP on localhost,
+each one on its own thread, so the graph is loaded a single time for any
+number of queries. The query function is the client for it
+'''
+import sys
+import json
+import contextlib
+import socket
+import threading
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from socketserver import ThreadingMixIn
+from urllib import request as urlrequest
+from urllib.error import URLError, HTTPError
+from src.conf import SERVER_HOST, SERVER_PORT, LANDMARKS
+from src.graph import Graph
+from src.instrument import say
+from src.results import finite
+
+def serve(reduced: bool = False, host: str = SERVER_HOST, port: int = SERVER_PORT):
+    '''
+    Loads the graph and answers queries until the process is interrupted
+    Args:
+        reduced: If reduced equals true it will use the reduced data
+            to create the graph, otherwise it will use the full data
+        host: The address to listen on
+        port: The port to listen on
+    '''
+    graph = Graph(reduced, compact=True)
+    # Build the lazy parts of the graph now, so the request threads only read it
+    _ = graph.name_index
+    _ = graph.components
+    graph.csr.matrix()
+    server = QueryServer((host, port), graph, reduced)
+    say("Serving queries on http://{}:{}\n".format(host, port))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+def query(request: dict, host: str = SERVER_HOST, port: int = SERVER_PORT,
+          timeout: float = None):
+    '''
+    Sends a query to the server
+    Args:
+        request: A dict with the name of the query on 'query' and its arguments
+        host: The address of the server
+        port: The port of the server
+        timeout: Seconds to wait for the answer, no limit if it is not set
+    Returns:
+        The answer of the server as a dict
+    Raises:
+        ConnectionError if the server is not running
+        ValueError if the server could not answer the query
+    '''
+    data = json.dumps(request).encode('utf-8')
+    http_request = urlrequest.Request("http://{}:{}/".format(host, port), data=data,
+                                      headers={"Content-Type": "application/json"})
+    try:
+        with urlrequest.urlopen(http_request, timeout=timeout) as response:
+            return json.loads(response.read().decode('utf-8'))
+    except HTTPError as error:
+        raise ValueError(json.loads(error.read().decode('utf-8'))['error'])
+    except URLError as error:
+        raise ConnectionError(str(error.reason))
+    except socket.timeout as error:
+        raise ConnectionError(str(error))
+
+def is_running(reduced: bool = False, host: str = SERVER_HOST, port: int = SERVER_PORT):
+    '''
+    Checks if a server is running with the reduced or the full data
+    Returns:
+        True if it is running with the same data, false otherwise
+    '''
+    try:
+        return query({"query": "ping"}, host, port, timeout=1)['reduced'] == reduced
+    except (ConnectionError, ValueError, KeyError):
+        return False
+
+class QueryServer(ThreadingMixIn, HTTPServer):
+
+    '''
+    HTTP server that answers each request on a new thread
+    Args:
+        address: A (host, port) tuple
+        graph: The Graph object used to answer the queries
+        reduced: If the graph was created with the reduced data
+    '''
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple, graph: Graph, reduced: bool):
+        self.graph = graph
+        self.reduced = reduced
+        # Only one request at a time starts a pool of processes
+        self.pool_lock = threading.Lock()
+        HTTPServer.__init__(self, address, QueryHandler)
+
+class QueryHandler(BaseHTTPRequestHandler):
+
+    '''
+    Handler of the requests of QueryServer
+    '''
+
+    def do_POST(self):
+        '''
+        Answers a query sent as a JSON object
+        '''
+        try:
+            length = int(self.headers.get('Content-Length', 0))
+            request = json.loads(self.rfile.read(length).decode('utf-8'))
+            answer = QUERIES[request['query']](self.server, request)
+            status = 200
+        except KeyError as error:
+            answer = {"error": "Missing or unknown {}".format(str(error))}
+            status = 400
+        except (ValueError, TypeError) as error:
+            answer = {"error": str(error)}
+            status = 400
+        data = json.dumps(answer).encode('utf-8')
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, message_format, *args):
+        '''
+        Prints the access log line of a request with say, so it is hidden
+        if quiet is set
+        '''
+        say("{} - - [{}] {}".format(self.address_string(), self.log_date_time_string(),
+                                    message_format % args), file=sys.stderr)
+
+def _author(graph: Graph, request: dict, key: str = 'author_id'):
+    '''
+    Gets an author id from a request, checking it is on the graph
+    '''
+    author_id = int(request[key])
+    if not graph.has_author(author_id):
+        raise ValueError("Author id {} does not exist on graph".format(str(author_id)))
+    return author_id
+
+def _ping(server: QueryServer, _: dict):
+    '''
+    Answers if the server is running with the reduced data
+    '''
+    return {"reduced": server.reduced}
+
+def _subgraph(server: QueryServer, request: dict):
+    '''
+    Answers the hop subgraph of author_id up to max_hop_dist, as in
+    Graph.get_subgraph_author, with its percentage of the author component
+    '''
+    graph = server.graph
+    author_id = _author(graph, request)
+    subgraph, node_list = graph.get_subgraph_author(author_id, int(request['max_hop_dist']))
+    return {
+        "node_list": node_list,
+        "edges": list(subgraph.edges()),
+        "component_percentage": round((len(subgraph.nodes())/graph.component_size(author_id))
+                                      * 100, 2)
+    }
+
+def _distance(server: QueryServer, request: dict):
+    '''
+    Answers the shortest path between author_id and target_id, or Aris if
+    target_id is not set
+    '''
+    graph = server.graph
+    author_id = _author(graph, request)
+    if request.get('target_id') is None:
+        path = graph.aris_distance(author_id, cached=request.get('cached', False))
+    else:
+        path = graph.author_distance(author_id, _author(graph, request, 'target_id'))
+    return {"path": path, "author_name": graph.get_author_name(author_id)}
+
+def _bounds(server: QueryServer, request: dict):
+    '''
+    Answers a lower and an upper bound of the shortest path weight between
+    author_id and target_id from the landmark oracle, None if they are not
+    connected
+    '''
+    graph = server.graph
+    author_id = _author(graph, request)
+    target_id = _author(graph, request, 'target_id')
+    lower, upper = graph.distance_bounds(author_id, target_id,
+                                         int(request.get('landmarks', LANDMARKS)),
+                                         request.get('strategy', 'degree'))
+    return {"lower": finite(lower), "upper": finite(upper)}
+
+def _nearest(server: QueryServer, request: dict):
+    '''
+    Answers the authors closest to author_id within radius, the k closest
+    ones, or both, and the edges of the subgraph they induce with author_id
+    '''
+    graph = server.graph
+    author_id = _author(graph, request)
+    radius = request.get('radius')
+    k = request.get('k')
+    nearest, subgraph = graph.nearest_authors(author_id,
+                                              None if radius is None else float(radius),
+                                              None if k is None else int(k))
+    return {"nearest": nearest, "edges": list(subgraph.edges())}
+
+def _authors(server: QueryServer, request: dict):
+    '''
+    Answers the ids of the authors named name and the authors whose name
+    starts with it
+    '''
+    graph = server.graph
+    return {
+        "author_ids": graph.find_authors(request['name']),
+        "completions": graph.complete_author_name(request['name'], request.get('limit', 10))
+    }
+
+def _group_numbers(server: QueryServer, request: dict):
+    '''
+    Answers the group numbers of nodes_list, with None for the unreachable nodes
+    '''
+    graph = server.graph
+    nodes_list = [int(node) for node in request['nodes_list'] if graph.has_author(int(node))]
+    distances, _, sources = graph.multi_source_shortest_path(nodes_list)
+    return {
+        "group_numbers": {node: finite(dist) for node, dist in distances.items()},
+        "group_sources": sources
+    }
+
+def _centralities(server: QueryServer, request: dict):
+    '''
+    Answers the centralities of the subgraph of conference_id, exact or
+    approximate as in Graph.get_centralities. They run on the request thread
+    unless the request sets more workers, then the pool of processes is
+    started by one request at a time
+    '''
+    graph = server.graph
+    subgraph = graph.get_subgraph_conf(int(request['conference_id']))
+    sampling = {key: request[key] for key in ('samples', 'epsilon', 'delta', 'seed')
+                if key in request}
+    workers = int(request.get('workers', 1))
+    if workers < 1:
+        raise ValueError("workers must be at least 1")
+    with server.pool_lock if workers > 1 else contextlib.nullcontext():
+        result = graph.get_centralities(subgraph, workers=workers,
+                                        approximate=request.get('approximate', False),
+                                        **sampling)
+    answer = {
+        "degree": dict(result[0]),
+        "closeness": result[1],
+        "betweenness": result[2]
+    }
+    if len(result) > 3:
+        bounds = result[3]
+        answer["bounds"] = dict(bounds, closeness={
+            node: finite(bound) for node, bound in bounds['closeness'].items()
+        })
+    return answer
+
+QUERIES = {
+    "ping": _ping,
+    "subgraph": _subgraph,
+    "distance": _distance,
+    "nearest": _nearest,
+    "bounds": _bounds,
+    "authors": _authors,
+    "group_numbers": _group_numbers,
+    "centralities": _centralities
+}
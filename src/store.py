@@ -0,0 +1,460 @@
+'''
+Module to persist the graph on disk as flat arrays.
+A store is a folder with one .npy file per array and a meta.json file.
+The arrays are opened with memory mapping, so loading is almost free and
+several processes reading the same store share the same pages
+'''
+import os
+import json
+from collections.abc import Mapping
+import shutil
+import hashlib
+import tempfile
+import numpy as np
+import networkx as nx
+from scipy.sparse import csr_matrix
+from src.csr import CSRGraph, row_positions
+from src.records import Catalog, NodeData, Publication, Conference
+
+VERSION = 3
+META = "meta.json"
+
+def fingerprint(data_path: str):
+    '''
+    Gets the fingerprint of the dataset a graph is created from
+    Args:
+        data_path: The path to the dataset
+    Returns:
+        A dict with the size, modification time and hash of the file
+    '''
+    digest = hashlib.blake2b()
+    with open(data_path, 'rb') as data_file:
+        for block in iter(lambda: data_file.read(1 << 20), b''):
+            digest.update(block)
+    stat = os.stat(data_path)
+    return {
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "hash": digest.hexdigest()
+    }
+
+class StringTable():
+
+    '''
+    Class to hold a list of strings as an offsets array and an utf-8 bytes array
+    Args:
+        offsets: Array where string i is data[offsets[i]:offsets[i+1]]
+        data: Array of bytes with all the strings concatenated
+    '''
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    @classmethod
+    def from_strings(cls, strings: list):
+        '''
+        Creates a string table from a list of strings
+        '''
+        encoded = [string.encode('utf-8') for string in strings]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum([len(string) for string in encoded], out=offsets[1:])
+        data = np.frombuffer(b''.join(encoded), dtype=np.uint8)
+        return cls(offsets, data)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int):
+        start, end = self.offsets[index], self.offsets[index + 1]
+        return self.data[start:end].tobytes().decode('utf-8')
+
+    def __iter__(self):
+        data = self.data.tobytes()
+        offsets = self.offsets.tolist()
+        for start, end in zip(offsets, offsets[1:]):
+            yield data[start:end].decode('utf-8')
+
+class RecordTable(Mapping):
+
+    '''
+    Table of publications or conferences read from the store arrays. The
+    records are created when they are read, so the strings stay on disk.
+    Records added later are kept on a dict
+    Args:
+        ids: The sorted array with the integer id of each record
+        record: The Record class, created with the strings of a row and its id
+        columns: The StringTables of the string fields, in the order the
+            record gets them, where the id goes after the first one
+    '''
+
+    def __init__(self, ids, record, *columns):
+        self.ids = ids
+        self.record = record
+        self.columns = columns
+        self.added = {}
+
+    def __getitem__(self, key: int):
+        if key in self.added:
+            return self.added[key]
+        position = self.__position(key)
+        if position is None:
+            raise KeyError(key)
+        strings = [column[position] for column in self.columns]
+        return self.record(strings[0], key, *strings[1:])
+
+    def __setitem__(self, key: int, record):
+        self.added[key] = record
+
+    def __contains__(self, key):
+        return key in self.added or self.__position(key) is not None
+
+    def __iter__(self):
+        yield from self.ids.tolist()
+        yield from self.added
+
+    def __len__(self):
+        return len(self.ids) + len(self.added)
+
+    def __position(self, key):
+        '''
+        Gets the position of key on ids, or None if it is not there
+        '''
+        try:
+            position = int(np.searchsorted(self.ids, key))
+        except TypeError:
+            return None
+        if position < len(self.ids) and self.ids[position] == key:
+            return position
+        return None
+
+class GraphStore():
+
+    '''
+    Class to hold the arrays of a graph: the CSR adjacency, the authors names,
+    the publications and conferences of each author, the publications and
+    conferences tables sorted by id and the inverted indexes with the authors
+    of each publication and conference. The adjacency is available as a
+    CSRGraph on the csr attribute.
+    Args:
+        arrays: A dict with the name and the array of each array in the store
+        meta: A dict with the metadata of the store
+    '''
+
+    def __init__(self, arrays: dict, meta: dict, path: str = None):
+        self.arrays = arrays
+        self.meta = meta
+        self.path = path
+        self.csr = CSRGraph(arrays['ids'], arrays['indptr'],
+                            arrays['indices'], arrays['weights'])
+        self.names = StringTable(arrays['names_offsets'], arrays['names_data'])
+
+    @classmethod
+    def from_networkx(cls, graph: nx.Graph, source: dict = None):
+        '''
+        Creates the store arrays from a NetworkX graph
+        Args:
+            graph: A NetworkX graph created by the Graph class
+            source: The fingerprint of the dataset the graph was created from
+        Returns:
+            A GraphStore object
+        '''
+        csr = CSRGraph.from_networkx(graph)
+        names = []
+        publications = {}
+        conferences = {}
+        pubs = ([0], [])
+        confs = ([0], [])
+        for author_id in csr.ids.tolist():
+            data = graph.nodes[author_id]['data']
+            names.append(data['author']['name'])
+            for publication in data['publications'].values():
+                pubs[1].append(_intern(publications, publication))
+            pubs[0].append(len(pubs[1]))
+            for conference in data['conferences'].values():
+                confs[1].append(_intern(conferences, conference))
+            confs[0].append(len(confs[1]))
+        publications, pubs_indices = _sort_table(publications, pubs[1])
+        conferences, confs_indices = _sort_table(conferences, confs[1])
+        arrays = {
+            'ids': csr.ids,
+            'indptr': csr.indptr,
+            'indices': csr.indices,
+            'weights': csr.weights,
+            'pubs_indptr': np.array(pubs[0], dtype=np.int64),
+            'pubs_indices': pubs_indices,
+            'confs_indptr': np.array(confs[0], dtype=np.int64),
+            'confs_indices': confs_indices,
+            'publication_ids': np.array([pub['id_int'] for pub in publications],
+                                        dtype=np.int64),
+            'conference_ids': np.array([conf['id_int'] for conf in conferences],
+                                       dtype=np.int64)
+        }
+        arrays['pub_authors_indptr'], arrays['pub_authors_indices'] = _invert(
+            arrays['pubs_indptr'], pubs_indices, len(publications))
+        arrays['conf_authors_indptr'], arrays['conf_authors_indices'] = _invert(
+            arrays['confs_indptr'], confs_indices, len(conferences))
+        tables = {
+            'names': names,
+            'publication_id_str': [pub['id_str'] for pub in publications],
+            'publication_title': [pub['title'] for pub in publications],
+            'conference_id_str': [conf['id_str'] for conf in conferences]
+        }
+        for name, strings in tables.items():
+            table = StringTable.from_strings(strings)
+            arrays[name + '_offsets'] = table.offsets
+            arrays[name + '_data'] = table.data
+        meta = {"version": VERSION, "source": source}
+        return cls(arrays, meta)
+
+    def save(self, path: str):
+        '''
+        Saves the store on a folder. The folder is written under a temporary
+        name and renamed at the end, so a reader never sees a partial store
+        Args:
+            path: The path of the folder
+        '''
+        tmp_path = path + '.tmp'
+        shutil.rmtree(tmp_path, ignore_errors=True)
+        os.makedirs(tmp_path)
+        for name, array in self.arrays.items():
+            np.save(os.path.join(tmp_path, name + '.npy'), array)
+        meta = dict(self.meta, arrays=sorted(self.arrays))
+        with open(os.path.join(tmp_path, META), 'w') as meta_file:
+            json.dump(meta, meta_file)
+        shutil.rmtree(path, ignore_errors=True)
+        os.rename(tmp_path, path)
+        self.path = path
+
+    @classmethod
+    def load(cls, path: str):
+        '''
+        Opens a store saved on a folder, with its arrays memory mapped
+        Args:
+            path: The path of the folder
+        Returns:
+            A GraphStore object
+        Raises:
+            FileNotFoundError if there is no store on path or if it was saved
+            by an incompatible version
+        '''
+        with open(os.path.join(path, META)) as meta_file:
+            meta = json.load(meta_file)
+        if meta.get("version") != VERSION:
+            raise FileNotFoundError("Store on {} has an old version".format(path))
+        arrays = {}
+        for name in meta.pop("arrays"):
+            arrays[name] = np.load(os.path.join(path, name + '.npy'), mmap_mode='r')
+        return cls(arrays, meta, path)
+
+    def save_derived(self, name: str, arrays: dict):
+        '''
+        Saves arrays computed from the graph, like a shortest path tree, on a
+        subfolder of the store. They are removed with the store when the
+        graph is created again, so they are never stale. Several processes or
+        threads can save the same arrays at once: each one writes its own
+        temporary file, and an array that is already saved is left as it is,
+        since every writer computed the same values
+        Args:
+            name: The name of the subfolder
+            arrays: A dict with the name and the array of each array
+        '''
+        folder = os.path.join(self.path, name)
+        os.makedirs(folder, exist_ok=True)
+        for array_name, array in arrays.items():
+            target = os.path.join(folder, array_name + '.npy')
+            if os.path.exists(target):
+                continue
+            handle, tmp_file = tempfile.mkstemp(dir=folder, prefix=array_name + '.',
+                                                suffix='.tmp.npy')
+            try:
+                with os.fdopen(handle, 'wb') as tmp:
+                    np.save(tmp, array)
+                os.replace(tmp_file, target)
+            except BaseException:
+                os.remove(tmp_file)
+                raise
+
+    def load_derived(self, name: str, array_names: list):
+        '''
+        Opens arrays saved with save_derived, memory mapped
+        Args:
+            name: The name of the subfolder
+            array_names: The names of the arrays to open
+        Returns:
+            A dict with the name and the array of each array
+        Raises:
+            FileNotFoundError if any of the arrays was not saved
+        '''
+        if self.path is None:
+            raise FileNotFoundError(name)
+        folder = os.path.join(self.path, name)
+        return {array_name: np.load(os.path.join(folder, array_name + '.npy'), mmap_mode='r')
+                for array_name in array_names}
+
+    def is_stale(self, data_path: str):
+        '''
+        Checks if the dataset changed after the store was created.
+        The hash of the dataset is only calculated if its size and modification
+        time are not enough to tell. If the dataset is missing the store is
+        considered up to date.
+        Args:
+            data_path: The path to the dataset
+        Returns:
+            True if the store must be created again, false otherwise
+        '''
+        source = self.meta.get("source")
+        if source is None or not os.path.exists(data_path):
+            return False
+        stat = os.stat(data_path)
+        if stat.st_size != source["size"]:
+            return True
+        if stat.st_mtime_ns == source["mtime_ns"]:
+            return False
+        return fingerprint(data_path)["hash"] != source["hash"]
+
+    def conference_authors(self, conference_id: int):
+        '''
+        Gets the authors who published at a conference
+        Args:
+            conference_id: The integer id of a conference
+        Returns:
+            An array with the ids of the authors, empty if the conference
+            is not on the store
+        '''
+        return self.__authors('conference_ids', 'conf_authors', conference_id)
+
+    def publication_authors(self, publication_id: int):
+        '''
+        Gets the authors of a publication
+        Args:
+            publication_id: The integer id of a publication
+        Returns:
+            An array with the ids of the authors, empty if the publication
+            is not on the store
+        '''
+        return self.__authors('publication_ids', 'pub_authors', publication_id)
+
+    def __authors(self, table: str, index: str, key: int):
+        '''
+        Gets the author ids of the entry key of an inverted index
+        '''
+        keys = self.arrays[table]
+        position = np.searchsorted(keys, key)
+        if position == len(keys) or keys[position] != key:
+            return self.csr.ids[:0]
+        start, end = self.arrays[index + '_indptr'][position:position + 2]
+        return self.csr.ids[self.arrays[index + '_indices'][start:end]]
+
+    def author_name(self, author_id: int):
+        '''
+        Gets the name of an author
+        Args:
+            author_id: The integer id of the author
+        Returns:
+            The name of the author as it is on the dataset
+        '''
+        return self.names[self.csr.index_of(author_id)]
+
+    def to_networkx(self):
+        '''
+        Creates the NetworkX graph, with the same catalog, node data and
+        edges the Graph class creates from the dataset
+        Returns:
+            A NetworkX graph object
+        '''
+        return self.__networkx(np.arange(len(self.csr)), iter(self.names))
+
+    def subgraph(self, nodes):
+        '''
+        Creates the NetworkX subgraph induced by some authors from their rows
+        of the arrays, so it costs as much as the subgraph and not the whole
+        graph. It has the same node data and edges as the subgraph of the
+        graph created by to_networkx
+        Args:
+            nodes: An array with the dense indices of the authors on csr
+        Returns:
+            A NetworkX graph object
+        '''
+        nodes = np.unique(np.asarray(nodes, dtype=np.int64))
+        return self.__networkx(nodes, (self.names[node] for node in nodes.tolist()))
+
+    def catalog(self):
+        '''
+        Gets the Catalog of the publications and conferences on the store,
+        whose records are read from the arrays when they are used
+        '''
+        arrays = self.arrays
+        pub_titles = StringTable(arrays['publication_title_offsets'],
+                                 arrays['publication_title_data'])
+        pub_id_strs = StringTable(arrays['publication_id_str_offsets'],
+                                  arrays['publication_id_str_data'])
+        conf_id_strs = StringTable(arrays['conference_id_str_offsets'],
+                                   arrays['conference_id_str_data'])
+        return Catalog(
+            RecordTable(arrays['publication_ids'], Publication, pub_id_strs, pub_titles),
+            RecordTable(arrays['conference_ids'], Conference, conf_id_strs)
+        )
+
+    def __networkx(self, nodes, names):
+        '''
+        Creates the NetworkX graph induced by the sorted array of dense
+        indices nodes, where names iterates the name of each one
+        '''
+        arrays = self.arrays
+        catalog = self.catalog()
+        # The ids of the publications and conferences of every author, as
+        # bytes of int64 that the arrays of the node data are created from
+        pub_positions, pubs_indptr = row_positions(arrays['pubs_indptr'], nodes)
+        conf_positions, confs_indptr = row_positions(arrays['confs_indptr'], nodes)
+        pub_refs = arrays['publication_ids'][arrays['pubs_indices'][pub_positions]]\
+            .astype(np.int64).tobytes()
+        conf_refs = arrays['conference_ids'][arrays['confs_indices'][conf_positions]]\
+            .astype(np.int64).tobytes()
+        pubs_indptr = (pubs_indptr * 8).tolist()
+        confs_indptr = (confs_indptr * 8).tolist()
+        ids = self.csr.ids[nodes].tolist()
+        graph = nx.Graph(catalog=catalog)
+        for i, (author_id, name) in enumerate(zip(ids, names)):
+            node = NodeData(author_id, name, catalog,
+                            pub_refs[pubs_indptr[i]:pubs_indptr[i + 1]],
+                            conf_refs[confs_indptr[i]:confs_indptr[i + 1]])
+            graph.add_node(author_id, data=node)
+        sources, targets, weights = self.csr.induced_edges(nodes)
+        all_ids = self.csr.ids
+        graph.add_weighted_edges_from(zip(all_ids[sources].tolist(), all_ids[targets].tolist(),
+                                          weights.tolist()))
+        return graph
+
+def _sort_table(table: dict, references: list):
+    '''
+    Sorts the records interned on table by id and maps the references
+    to their positions on the sorted table
+    Returns:
+        A tuple with the sorted list of records and the references array
+    '''
+    records = [record for _, record in table.values()]
+    order = np.argsort([record['id_int'] for record in records], kind='stable')
+    rank = np.empty(len(records), dtype=np.int32)
+    rank[order] = np.arange(len(records), dtype=np.int32)
+    references = rank[np.array(references, dtype=np.int64)] if references \
+        else np.zeros(0, dtype=np.int32)
+    return [records[i] for i in order.tolist()], references
+
+def _invert(indptr, indices, columns: int):
+    '''
+    Transposes a CSR incidence of rows (authors) to columns (publications or
+    conferences) into, for each column, the sorted rows that reference it
+    Returns:
+        A tuple with the indptr and the indices arrays of the inverted index
+    '''
+    incidence = csr_matrix((np.ones(len(indices), dtype=np.int8), indices, indptr),
+                           shape=(len(indptr) - 1, columns)).tocsc()
+    return incidence.indptr.astype(np.int64), incidence.indices.astype(np.int32)
+
+def _intern(table: dict, record: dict):
+    '''
+    Gets the position of a publication or conference record on table,
+    adding it if it is not there yet
+    '''
+    return table.setdefault(record['id_int'], (len(table), record))[0]
@@ -0,0 +1,44 @@
+'''
+Module to calculate the edge weights of the co-authorship graph in bulk.
+The weight of an edge is 1 - jaccard similarity between the publications
+of its two authors
+'''
+import numpy as np
+from scipy.sparse import csr_matrix
+
+def jaccard_weights(graph, edges: list):
+    '''
+    Calculates 1 - jaccard similarity for a list of edges at once.
+    A sparse author x publication incidence matrix A is built a single time
+    for the authors on edges, and the number of publications in common of
+    every pair is read from A.A^T. The jaccard similarity is that number
+    divided by the number of total publications between the two authors.
+    Args:
+        graph: A NetworkX graph whose nodes have the publications data
+        edges: A list of (author id, author id) tuples
+    Returns:
+        A list with the weight of each edge, in the same order as edges
+    '''
+    if not edges:
+        return []
+    authors = {}
+    for edge in edges:
+        for author_id in edge:
+            if author_id not in authors:
+                authors[author_id] = len(authors)
+    columns = {}
+    indptr = [0]
+    indices = []
+    for author_id in authors:
+        for publication_id in graph.nodes[author_id]['data']['publications']:
+            indices.append(columns.setdefault(publication_id, len(columns)))
+        indptr.append(len(indices))
+    incidence = csr_matrix((np.ones(len(indices), dtype=np.int32), indices, indptr),
+                           shape=(len(authors), len(columns)))
+    common = (incidence @ incidence.T).tocsr()
+    totals = np.diff(incidence.indptr)
+    rows = np.array([authors[author_id] for author_id, _ in edges])
+    cols = np.array([authors[author_id] for _, author_id in edges])
+    intersection = np.asarray(common[rows, cols]).ravel()
+    union = totals[rows] + totals[cols] - intersection
+    return (1 - intersection / union).tolist()
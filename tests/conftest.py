@@ -0,0 +1,45 @@
+'''
+Fixtures of the tests. Every test runs on its own folder, where the Graph
+class finds the reduced dataset and saves its store as configured on conf.py
+'''
+import os
+import json
+import pytest
+from src.conf import RED_DATA
+from src.instrument import set_quiet
+
+@pytest.fixture
+def workdir(tmp_path, monkeypatch):
+    '''
+    Runs the test on an empty folder with the prints turned off
+    '''
+    monkeypatch.chdir(tmp_path)
+    os.makedirs(os.path.dirname(RED_DATA))
+    set_quiet()
+    yield tmp_path
+    set_quiet(False)
+
+def publication(number: int, authors: list, conference: int = 0):
+    '''
+    Gets a publication record with the schema of the dataset
+    Args:
+        number: The integer id of the publication
+        authors: The list of the integer ids of its authors
+        conference: The integer id of its conference
+    '''
+    return {
+        "id_conference": "conf/test/{}".format(conference),
+        "id_conference_int": conference,
+        "id_publication": "conf/test/{}/{}".format(conference, number),
+        "id_publication_int": number,
+        "title": "Publication {}".format(number),
+        "authors": [{"author": "author {}".format(author), "author_id": author}
+                    for author in authors]
+    }
+
+def write_dataset(path: str, publications: list):
+    '''
+    Writes a list of publication records as a dataset
+    '''
+    with open(path, 'w') as output:
+        json.dump(publications, output)
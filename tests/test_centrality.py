@@ -0,0 +1,23 @@
+'''
+Tests that the parallel centralities are the same as the NetworkX ones,
+with one and with many processes
+'''
+import pytest
+import networkx as nx
+from benchmarks.generate import generate_dataset
+from src.conf import RED_DATA
+from src.graph import Graph
+from src.centrality import centralities
+
+@pytest.mark.parametrize('workers', [1, 2])
+def test_centralities(workdir, workers):
+    generate_dataset(RED_DATA, 300, seed=4)
+    graph = Graph(True)
+    conference_id = graph.store.arrays['conference_ids'][0].item()
+    for subgraph in (graph.get_subgraph_conf(conference_id), graph.graph):
+        degree, closeness, betweenness = centralities(subgraph, workers=workers)
+        assert dict(degree) == dict(nx.degree(subgraph))
+        assert closeness == pytest.approx(nx.closeness_centrality(subgraph, distance='weight'),
+                                          abs=1e-12)
+        assert betweenness == pytest.approx(nx.betweenness_centrality(subgraph, weight='weight'),
+                                            abs=1e-12)
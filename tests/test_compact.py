@@ -0,0 +1,143 @@
+'''
+Tests that the compact engine (Graph with compact=True) gives the same
+shortest paths and group numbers as the NetworkX engine
+'''
+import random
+import pytest
+import networkx as nx
+from benchmarks.generate import generate_dataset
+from src.conf import RED_DATA
+from src.graph import Graph
+from tests.conftest import publication, write_dataset
+
+# Two paths of the same weight between 1 and 4 (through 2 and through 3),
+# a second component and an author without co-authors
+TIES = [
+    publication(1, [1, 2]),
+    publication(2, [2, 4]),
+    publication(3, [1, 3]),
+    publication(4, [3, 4]),
+    publication(5, [5, 6], conference=1),
+    publication(6, [6, 7], conference=1),
+    publication(7, [8], conference=1)
+]
+
+@pytest.fixture(params=['ties', 'synthetic'])
+def engines(request, workdir):
+    '''
+    Gets the NetworkX and the compact engines of the same graph
+    '''
+    if request.param == 'ties':
+        write_dataset(RED_DATA, TIES)
+    else:
+        generate_dataset(RED_DATA, 300, seed=1)
+    return Graph(True), Graph(True, compact=True)
+
+def _authors(graph: Graph, number: int = 15):
+    '''
+    Gets a sample of the authors of the graph, always the same one
+    '''
+    authors = sorted(graph.graph.nodes())
+    return random.Random(0).sample(authors, min(number, len(authors)))
+
+def _check_tree(graph: nx.Graph, distances: dict, prev: dict):
+    '''
+    Checks that every predecessor is on a shortest path to its node
+    '''
+    for node, previous in prev.items():
+        assert distances[previous] + graph[previous][node]['weight'] == \
+            pytest.approx(distances[node], rel=1e-12)
+
+def _check_path(graph: nx.Graph, path: list, distance: float):
+    '''
+    Checks that a path of author_distance is a path of graph with the
+    given weight
+    '''
+    total = 0
+    for (current, _, _), (following, following_dist, _) in zip(path, path[1:]):
+        total += graph[current][following]['weight']
+        assert following_dist == pytest.approx(total, rel=1e-12)
+    assert total == pytest.approx(distance, rel=1e-12)
+
+def test_shortest_path(engines):
+    networkx_engine, compact = engines
+    graph = networkx_engine.graph
+    for start in _authors(networkx_engine):
+        reference = nx.single_source_dijkstra_path_length(graph, start)
+        for engine in engines:
+            distances, prev = engine.shortest_path(start)
+            assert set(distances) == set(graph.nodes())
+            for node, distance in distances.items():
+                assert distance == pytest.approx(reference.get(node, float('inf')), rel=1e-12)
+            assert set(prev) == set(reference) - {start}
+            _check_tree(graph, distances, prev)
+    assert compact.csr is not None and networkx_engine.csr is None
+
+def test_author_distance(engines):
+    networkx_engine, compact = engines
+    graph = networkx_engine.graph
+    authors = _authors(networkx_engine)
+    for author_id, target_id in zip(authors, authors[::-1]):
+        try:
+            reference = nx.dijkstra_path_length(graph, target_id, author_id)
+        except nx.NetworkXNoPath:
+            reference = None
+        for engine in engines:
+            for landmarks in (False, True):
+                path = engine.author_distance(author_id, target_id, landmarks)
+                if reference is None or author_id == target_id:
+                    assert path is None
+                else:
+                    assert path[0][0] == target_id and path[-1][0] == author_id
+                    _check_path(graph, path, reference)
+
+def test_ties(workdir):
+    write_dataset(RED_DATA, TIES)
+    for engine in (Graph(True), Graph(True, compact=True)):
+        path = engine.author_distance(4, 1)
+        assert [node for node, _, _ in path][::2] == [1, 4]
+        assert path[1][0] in (2, 3)
+        assert path[-1][1] == pytest.approx(4 / 3)
+        distances, prev = engine.shortest_path(1)
+        assert distances[2] == distances[3] == pytest.approx(2 / 3)
+        assert prev[4] in (2, 3)
+
+def test_group_numbers(engines):
+    networkx_engine, compact = engines
+    graph = networkx_engine.graph
+    seeds = _authors(networkx_engine, 3)
+    lengths = {seed: nx.single_source_dijkstra_path_length(graph, seed) for seed in seeds}
+    for engine in engines:
+        engine.set_group_number(seeds)
+        assert set(engine.group_numbers) == set(graph.nodes())
+        for node, number in engine.group_numbers.items():
+            reference = min(lengths[seed].get(node, float('inf')) for seed in seeds)
+            assert number == pytest.approx(reference, rel=1e-12)
+            if number == float('inf'):
+                assert node not in engine.group_sources
+            else:
+                # On a tie between seeds any of them is a valid source
+                source = engine.group_sources[node]
+                assert lengths[source][node] == pytest.approx(number, rel=1e-12)
+    assert compact.group_numbers == pytest.approx(networkx_engine.group_numbers, rel=1e-12)
+
+def test_unknown_and_unreachable(workdir):
+    write_dataset(RED_DATA, TIES)
+    for engine in (Graph(True), Graph(True, compact=True)):
+        assert engine.shortest_path(-1)[1] is None
+        assert engine.shortest_path(1, finish=-1)[1] is None
+        assert engine.shortest_path(1, finish=-1, bidirectional=True)[1] is None
+        assert engine.author_distance(-1, 1) is None
+        assert engine.author_distance(1, -1) is None
+        assert engine.author_distance(5, 1) is None
+        assert engine.author_distance(8, 1, landmarks=True) is None
+        distances, prev = engine.shortest_path(1)
+        assert distances[5] == distances[8] == float('inf')
+        assert 5 not in prev and 8 not in prev
+        engine.set_group_number([-1, 1, 4])
+        assert engine.group_numbers[8] == float('inf')
+        assert engine.group_numbers[2] == pytest.approx(2 / 3)
+        assert engine.group_sources[2] in (1, 4)
+        assert engine.group_sources[1] == 1 and engine.group_sources[4] == 4
+        engine.set_group_number([-1])
+        assert set(engine.group_numbers.values()) == {float('inf')}
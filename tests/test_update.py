@@ -0,0 +1,92 @@
+'''
+Tests that applying a delta of publications to a saved graph gives the
+same graph as creating it from the merged dataset
+'''
+import os
+import json
+import numpy as np
+from benchmarks.generate import generate_dataset
+from src.conf import RED_DATA
+from src.graph import Graph
+from tests.conftest import write_dataset
+
+def _edges(graph: Graph):
+    '''
+    Gets the weight of each edge of the saved graph
+    '''
+    return {(min(first, second), max(first, second)): weight
+            for first, second, weight in graph.store.to_networkx().edges(data='weight')}
+
+def _nodes(graph: Graph):
+    '''
+    Gets the name, publications and conferences of each author of the saved graph
+    '''
+    return {author_id: (data['author']['name'], sorted(data['publications']),
+                        sorted(data['conferences']))
+            for author_id, data in graph.store.to_networkx().nodes(data='data')}
+
+def _components(graph: Graph):
+    '''
+    Gets the connected components as a set of sets of author ids
+    '''
+    labels = np.asarray(graph.components['labels'])
+    ids = graph.store.csr.ids
+    return {frozenset(ids[labels == label].tolist()) for label in np.unique(labels)}
+
+def _publications(workdir):
+    '''
+    Gets the publications of a synthetic dataset
+    '''
+    path = os.path.join(str(workdir), 'synthetic.json')
+    generate_dataset(path, 300, seed=2)
+    with open(path) as data_file:
+        return json.load(data_file)
+
+def test_apply_matches_rebuild(workdir, monkeypatch):
+    publications = _publications(workdir)
+    cut = len(publications) * 7 // 10
+    write_dataset(RED_DATA, publications[:cut])
+    write_dataset('delta.json', publications[cut:])
+    base = Graph(True)
+    base_nodes, base_edges = len(base.store.csr), len(_edges(base))
+    _ = base.components
+    updated = Graph(True)
+    summary = updated.apply_publications('delta.json')
+
+    merged = os.path.join(str(workdir), 'merged')
+    os.makedirs(os.path.join(merged, os.path.dirname(RED_DATA)))
+    write_dataset(os.path.join(merged, RED_DATA), publications)
+    monkeypatch.chdir(merged)
+    rebuilt = Graph(True)
+
+    assert np.array_equal(updated.store.csr.ids, rebuilt.store.csr.ids)
+    assert _edges(updated) == _edges(rebuilt)
+    assert _nodes(updated) == _nodes(rebuilt)
+    for name in ('publication_ids', 'conference_ids'):
+        assert np.array_equal(updated.store.arrays[name], rebuilt.store.arrays[name])
+    for conference_id in rebuilt.store.arrays['conference_ids'].tolist():
+        assert updated.conference_authors(conference_id) == \
+            rebuilt.conference_authors(conference_id)
+    assert _components(updated) == _components(rebuilt)
+    assert sorted(updated.components['sizes']) == sorted(rebuilt.components['sizes'])
+    assert summary['authors'] == len(rebuilt.store.csr) - base_nodes
+    assert summary['edges'] == len(_edges(rebuilt)) - base_edges
+
+def test_apply_twice(workdir):
+    publications = _publications(workdir)
+    cut = len(publications) // 2
+    write_dataset(RED_DATA, publications[:cut])
+    write_dataset('delta.json', publications[cut:])
+    graph = Graph(True)
+    assert graph.apply_publications('delta.json')['weighted'] > 0
+    edges, nodes, components = _edges(graph), _nodes(graph), _components(graph)
+    meta_time = os.path.getmtime(os.path.join(graph.store.path, 'meta.json'))
+
+    for again in (graph, Graph(True)):
+        assert again.apply_publications('delta.json') == {"authors": 0, "edges": 0,
+                                                          "weighted": 0}
+        assert len(again.store.meta['deltas']) == 1
+        assert _edges(again) == edges
+        assert _nodes(again) == nodes
+        assert _components(again) == components
+    assert os.path.getmtime(os.path.join(graph.store.path, 'meta.json')) == meta_time
@@ -0,0 +1,50 @@
+'''
+Tests that the bulk Jaccard weights are the same as the weights of the
+set based calculation of each edge
+'''
+from benchmarks.generate import generate_dataset
+from src.conf import RED_DATA
+from src.graph import Graph
+from src.weights import jaccard_weights
+from tests.conftest import publication, write_dataset
+
+def _weight(node1, node2):
+    '''
+    1 - jaccard similarity between the publications of two nodes, one edge
+    at a time with sets
+    '''
+    pubs1 = set(node1['publications'].keys())
+    pubs2 = set(node2['publications'].keys())
+    return 1 - (len(pubs1.intersection(pubs2))/len(pubs1.union(pubs2)))
+
+def _set_weights(graph, edges: list):
+    '''
+    Gets the set based weight of each edge
+    '''
+    return [_weight(graph.nodes[first]['data'], graph.nodes[second]['data'])
+            for first, second in edges]
+
+def test_jaccard_weights(workdir):
+    generate_dataset(RED_DATA, 300, seed=3)
+    graph = Graph(True).graph
+    edges = list(graph.edges())
+    expected = _set_weights(graph, edges)
+    assert jaccard_weights(graph, edges) == expected
+    assert [graph[first][second]['weight'] for first, second in edges] == expected
+    # A subset of the edges, in another order, as a delta weights them
+    subset = edges[::-3]
+    assert jaccard_weights(graph, subset) == _set_weights(graph, subset)
+
+def test_jaccard_weights_small(workdir):
+    write_dataset(RED_DATA, [
+        publication(1, [1, 2, 3]),
+        publication(2, [1, 2]),
+        publication(3, [2, 4]),
+        publication(4, [1])
+    ])
+    graph = Graph(True).graph
+    weights = dict(zip(graph.edges(), jaccard_weights(graph, list(graph.edges()))))
+    assert weights[(1, 2)] == 1 - 2 / 4
+    assert weights[(1, 3)] == 1 - 1 / 3
+    assert weights[(2, 4)] == 1 - 1 / 3
+    assert jaccard_weights(graph, []) == []